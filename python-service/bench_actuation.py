@@ -0,0 +1,82 @@
+# python-service/bench_actuation.py
+# Replays traced arduino-command payloads through bridge.py's handler, serial writer and a pty fake
+# Arduino, and reports actuation latency (light decision -> serial write complete) per hop.
+#
+# Usage:
+#   python bench_actuation.py                          # 5000 commands at 50/s, 9600 baud
+#   python bench_actuation.py --commands 20000 --rate 500 --output actuation_results.json
+
+import argparse
+import json
+import random
+import time
+
+import bridge
+from fake_serial import FakeSerialDevice
+from serial_writer import SerialWriter
+
+STATES = ['G', 'Y', 'R']
+
+
+def traced_payload(seq, rng, server_delay):
+    """What GTM.js emits: the command plus epoch-ms decision/emit stamps."""
+    decided_at = time.time() * 1000
+    return {
+        "command": ','.join(rng.choice(STATES) for _ in range(4)),
+        "seq": seq,
+        "decidedAt": decided_at,
+        "emittedAt": decided_at + server_delay * 1000,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure actuation latency through the bridge on a fake serial port.")
+    parser.add_argument('--commands', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=50, help="Commands per second")
+    parser.add_argument('--baud', type=int, default=9600)
+    parser.add_argument('--server-delay', type=float, default=0.0, help="Simulated decide -> emit delay (s)")
+    parser.add_argument('--output', help="Optional JSON file for the report")
+    args = parser.parse_args()
+
+    # A pty accepts writes into its buffer without waiting for the wire, so also time each line
+    # to when the (baud-paced) fake Arduino has actually received it
+    tracer = bridge.tracer = bridge.ActuationTracer(max_samples=None)
+    decided_by_line = {} # line -> decision time of the latest command asking for it
+
+    def on_line(_, line):
+        if line in decided_by_line:
+            tracer.timer.record('arduino_received', time.time() - decided_by_line[line])
+
+    device = FakeSerialDevice(args.baud, on_line=on_line)
+    bridge.writer = SerialWriter(device.port_name, args.baud, on_written=tracer.on_written,
+                                 boot_delay=0, keepalive_interval=None).start() # No board to reset; repeats would skew the hops
+    rng = random.Random(0)
+
+    print(f"--- Replaying {args.commands} commands at {args.rate}/s into {device.port_name} ({args.baud} baud) ---")
+    interval = 1 / args.rate
+    next_at = time.perf_counter()
+    for seq in range(1, args.commands + 1):
+        next_at += interval
+        payload = traced_payload(seq, rng, args.server_delay)
+        decided_by_line[payload['command']] = payload['decidedAt'] / 1000
+        bridge.on_arduino_command(payload)
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    while bridge.writer.pending() or len(device.lines) < bridge.writer.writes:
+        time.sleep(0.01)
+    bridge.writer.stop()
+    device.close()
+
+    report = {"commands": args.commands, "rate": args.rate, "baud": args.baud,
+              "writer": bridge.writer.stats(), "hops": tracer.report()}
+    report['hops']['arduino_received'] = tracer.timer.summary().get('arduino_received')
+    print(f"\n{'hop':<16}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for hop, s in report['hops'].items():
+        print(f"{hop:<16}{s['count']:>8}{s['p50_ms']:>10.3f}{s['p99_ms']:>10.3f}{s['mean_ms']:>10.3f}")
+    print(f"\nwriter: {report['writer']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"--- ✅ Results written to {args.output} ---")
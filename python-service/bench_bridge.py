@@ -0,0 +1,102 @@
+# python-service/bench_bridge.py
+# Throughput and latency of the Arduino bridge's serial path against a pty fake device (no hardware).
+#
+# Usage:
+#   python bench_bridge.py                         # 2000 commands in bursts of 50, 9600 baud
+#   python bench_bridge.py --commands 5000 --burst 200 --baud 115200
+
+import argparse
+import random
+import time
+
+import numpy as np
+import serial
+
+from fake_serial import FakeSerialDevice
+from serial_writer import SerialWriter
+
+STATES = ['G', 'Y', 'R']
+
+
+def random_commands(count, lanes=4, seed=0):
+    rng = random.Random(seed)
+    return [','.join(rng.choice(STATES) for _ in range(lanes)) for _ in range(count)]
+
+
+def percentiles_ms(samples):
+    if not samples:
+        return {}
+    ms = np.asarray(samples) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            "max_ms": round(float(ms.max()), 3)}
+
+
+def bench_inline(commands, burst, baud_rate, gap):
+    """The old bridge: every command written on the caller's (socket.io) thread."""
+    device = FakeSerialDevice(baud_rate)
+    port = serial.Serial(device.port_name, baud_rate, timeout=.1)
+    submitted = []
+    blocked = []
+    start = time.perf_counter()
+    for i, command in enumerate(commands):
+        t = time.perf_counter()
+        submitted.append(t)
+        port.write((command + '\n').encode('utf-8'))
+        port.flush()
+        blocked.append(time.perf_counter() - t)
+        if (i + 1) % burst == 0:
+            time.sleep(gap)
+    while len(device.lines) < len(commands) and time.perf_counter() - start < 120:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    port.close()
+    device.close()
+    # Every command is written, in order, so line i answers command i
+    latencies = [received - sent for (received, _), sent in zip(device.lines, submitted)]
+    return {"mode": "inline", "seconds": round(elapsed, 3), "lines_written": len(device.lines),
+            "caller_blocked": percentiles_ms(blocked), "latency_to_device": percentiles_ms(latencies)}
+
+
+def bench_writer(commands, burst, baud_rate, gap):
+    """SerialWriter: submit() returns at once; the writer coalesces and skips unchanged states."""
+    submitted_at = {} # line -> time of the latest command asking for it
+    latencies = []
+    device = FakeSerialDevice(baud_rate, on_line=lambda received, line: latencies.append(received - submitted_at[line]))
+    writer = SerialWriter(device.port_name, baud_rate,
+                          boot_delay=0, keepalive_interval=None).start() # A pty has no board to reset, and repeats would skew the latencies
+    blocked = []
+    start = time.perf_counter()
+    for i, command in enumerate(commands):
+        t = time.perf_counter()
+        submitted_at[command] = t
+        writer.submit(command)
+        blocked.append(time.perf_counter() - t)
+        if (i + 1) % burst == 0:
+            time.sleep(gap)
+    while writer.pending() and time.perf_counter() - start < 120:
+        time.sleep(0.01)
+    time.sleep(0.1 + 20 * 10 / baud_rate) # Let the last line cross the wire
+    elapsed = time.perf_counter() - start
+    writer.stop()
+    device.close()
+
+    final_state_ok = bool(device.lines) and device.lines[-1][1] == commands[-1]
+    return {"mode": "writer", "seconds": round(elapsed, 3), "lines_written": len(device.lines),
+            "caller_blocked": percentiles_ms(blocked), "latency_to_device": percentiles_ms(latencies),
+            "final_state_ok": final_state_ok, **writer.stats()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the bridge's serial writer on a fake serial device.")
+    parser.add_argument('--commands', type=int, default=2000)
+    parser.add_argument('--burst', type=int, default=50, help="Commands sent back to back (e.g. a VIP override)")
+    parser.add_argument('--gap', type=float, default=0.05, help="Seconds between bursts")
+    parser.add_argument('--baud', type=int, default=9600)
+    args = parser.parse_args()
+
+    commands = random_commands(args.commands)
+    for result in (bench_inline(commands, args.burst, args.baud, args.gap),
+                   bench_writer(commands, args.burst, args.baud, args.gap)):
+        print(f"\n--- {result.pop('mode')} ---")
+        for key, value in result.items():
+            print(f"{key:<20}{value}")
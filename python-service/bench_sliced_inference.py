@@ -0,0 +1,82 @@
+# python-service/bench_sliced_inference.py
+# Compares per-frame latency of SAHI's per-slice get_sliced_prediction against the batched path.
+# Usage: python bench_sliced_inference.py north_cam.mp4 [num_frames] [frames_per_batch]
+
+import sys
+import time
+
+import cv2
+import numpy as np
+from sahi.predict import get_sliced_prediction
+
+from detections import Detections
+from inference_server import load_detection_model
+from sliced_inference import OVERLAP_RATIO, SLICE_HEIGHT, SLICE_WIDTH, get_slices, predict_sliced_batch
+
+
+def read_frames(video_path, count):
+    """Reads 'count' frames spread evenly over the video."""
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or count
+    frames = []
+    for index in np.linspace(0, total - 1, count).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+
+def report(name, latencies):
+    latencies = np.array(latencies) * 1000
+    print(f"{name:<28} mean {latencies.mean():8.1f} ms   p50 {np.percentile(latencies, 50):8.1f} ms   "
+          f"p95 {np.percentile(latencies, 95):8.1f} ms")
+
+
+if __name__ == '__main__':
+    video_path = "videos/" + (sys.argv[1] if len(sys.argv) > 1 else "north_cam.mp4")
+    num_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    frames_per_batch = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    frames = read_frames(video_path, num_frames)
+    if not frames:
+        print(f"--- ❌ ERROR: Could not read frames from {video_path} ---")
+        sys.exit(1)
+
+    detection_model, device = load_detection_model()
+    print(f"--- {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, "
+          f"{len(get_slices(frames[0].shape))} slices each, device {device} ---")
+
+    # Warm up both paths so the first-call cost doesn't skew the numbers
+    get_sliced_prediction(frames[0], detection_model, slice_height=SLICE_HEIGHT, slice_width=SLICE_WIDTH,
+                          overlap_height_ratio=OVERLAP_RATIO, overlap_width_ratio=OVERLAP_RATIO, verbose=0)
+    predict_sliced_batch(frames[:1], detection_model)
+
+    per_slice, per_slice_counts = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        result = get_sliced_prediction(frame, detection_model, slice_height=SLICE_HEIGHT, slice_width=SLICE_WIDTH,
+                                       overlap_height_ratio=OVERLAP_RATIO, overlap_width_ratio=OVERLAP_RATIO, verbose=0)
+        per_slice.append(time.perf_counter() - start)
+        per_slice_counts.append(len(Detections.from_object_predictions(result.object_prediction_list)))
+
+    batched, batched_counts = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        detections = predict_sliced_batch([frame], detection_model)[0]
+        batched.append(time.perf_counter() - start)
+        batched_counts.append(len(detections))
+
+    multi_frame = []
+    for start_index in range(0, len(frames), frames_per_batch):
+        chunk = frames[start_index:start_index + frames_per_batch]
+        start = time.perf_counter()
+        predict_sliced_batch(chunk, detection_model)
+        # Spread the batch time over its frames
+        multi_frame.extend([(time.perf_counter() - start) / len(chunk)] * len(chunk))
+
+    report("per-slice (SAHI)", per_slice)
+    report("batched, 1 frame", batched)
+    report(f"batched, {frames_per_batch} frames (per frame)", multi_frame)
+    print(f"Detections per frame: per-slice {np.mean(per_slice_counts):.1f}, batched {np.mean(batched_counts):.1f}")
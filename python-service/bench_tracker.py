@@ -0,0 +1,72 @@
+# python-service/bench_tracker.py
+# Synthetic benchmark for tracker.Tracker: N objects moving at constant velocity with jittered boxes.
+# Usage: python bench_tracker.py [num_tracks] [num_frames]
+
+import sys
+import time
+
+import numpy as np
+
+from tracker import Tracker
+
+TARGET_FPS = 25
+FRAME_WIDTH, FRAME_HEIGHT = 3840, 2160
+
+
+def simulate(num_tracks, num_frames, seed=0):
+    """Yields (boxes, class_ids, scores, true_ids) per frame; objects bounce off the frame edges."""
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform([0, 0], [FRAME_WIDTH, FRAME_HEIGHT], size=(num_tracks, 2))
+    velocities = rng.uniform(-8, 8, size=(num_tracks, 2))
+    sizes = rng.uniform(40, 120, size=(num_tracks, 2))
+    class_ids = rng.integers(0, 7, size=num_tracks).astype(np.int32)
+
+    for _ in range(num_frames):
+        positions = positions + velocities
+        outside = (positions < 0) | (positions > [FRAME_WIDTH, FRAME_HEIGHT])
+        velocities[outside] *= -1
+        centers = positions + rng.normal(0, 1.5, size=positions.shape)
+        half = sizes / 2 + rng.normal(0, 1.0, size=sizes.shape)
+        boxes = np.concatenate([centers - half, centers + half], axis=1).astype(np.float32)
+        scores = rng.uniform(0.3, 0.95, size=num_tracks).astype(np.float32)
+
+        # Shuffle like a detector would, and miss ~3% of objects each frame
+        seen = rng.permutation(num_tracks)[: int(num_tracks * 0.97)]
+        yield boxes[seen], class_ids[seen], scores[seen], seen
+
+
+if __name__ == '__main__':
+    num_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    num_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    tracker = Tracker()
+    latencies = []
+    id_of_object = {}
+    switches = 0
+    for boxes, class_ids, scores, true_ids in simulate(num_tracks, num_frames):
+        start = time.perf_counter()
+        tracked = tracker.update(boxes, class_ids, scores)
+        latencies.append(time.perf_counter() - start)
+
+        # Count ID switches: a true object showing up under a different track id than before
+        if len(tracked):
+            centers = tracked.centers()
+            det_centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+            nearest = np.argmin(((centers[:, None, :] - det_centers[None, :, :]) ** 2).sum(axis=2), axis=1)
+            for track_id, det_index in zip(tracked.ids, nearest):
+                obj = true_ids[det_index]
+                if obj in id_of_object and id_of_object[obj] != track_id:
+                    switches += 1
+                id_of_object[obj] = track_id
+
+    latencies = np.array(latencies[10:]) * 1000 # Skip the start-up frames
+    fps = 1000 / latencies.mean()
+    print(f"--- Tracker: {num_tracks} tracks, {num_frames} frames ---")
+    print(f"mean {latencies.mean():.3f} ms   p50 {np.percentile(latencies, 50):.3f} ms   "
+          f"p99 {np.percentile(latencies, 99):.3f} ms   => {fps:.0f} FPS on one core")
+    print(f"Active tracks at the end: {len(tracker.tracks)}, ID switches: {switches}")
+    if fps >= TARGET_FPS:
+        print(f"--- ✅ Meets the {TARGET_FPS} FPS target. ---")
+    else:
+        print(f"--- ❌ Below the {TARGET_FPS} FPS target. ---")
+        sys.exit(1)
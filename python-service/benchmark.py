@@ -0,0 +1,166 @@
+# python-service/benchmark.py
+# Headless replay benchmark for the camera analysis pipeline. No server needed: the network sink is stubbed.
+#
+# Usage:
+#   python benchmark.py                              # every video in videos/, one full-frame Traffic ROI
+#   python benchmark.py --config cameras.json        # camera configs as returned by /api/intersections/:id
+#   python benchmark.py north_cam.mp4 --frames 100 --output bench_results.json
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+
+from inference_server import LocalDetectionModel
+from main import CameraAnalyzer, submit_payload
+from timing import StageTimer
+from transport import pack_frame_payload
+
+VIDEO_DIR = "videos"
+STAGES = ['decode', 'motion', 'slicing', 'inference', 'merge', 'roi_assignment', 'occupancy', 'coarse_calibration',
+          'annotation', 'jpeg_encode', 'send']
+
+
+class NullSender:
+    """Stands in for FrameSender: serializes the payload like a real send would, then drops it."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.sent = 0
+
+    def submit(self, payload, jpeg_bytes=None):
+        body = pack_frame_payload(payload, jpeg_bytes) if jpeg_bytes is not None else json.dumps(payload).encode('utf-8')
+        self.bytes_sent += len(body)
+        self.sent += 1
+
+
+def load_camera_configs(args):
+    """Camera configs from --config, or one config per video with a full-frame Traffic ROI."""
+    if args.config:
+        with open(args.config) as f:
+            data = json.load(f)
+        cameras = data.get('cameras', data) if isinstance(data, dict) else data
+        if args.videos:
+            cameras = [c for c in cameras if c.get('videoSource') in args.videos]
+        return cameras
+
+    videos = args.videos or sorted(v for v in os.listdir(VIDEO_DIR) if v.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')))
+    cameras = []
+    for video in videos:
+        cap = cv2.VideoCapture(os.path.join(VIDEO_DIR, video))
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        cameras.append({
+            "name": os.path.splitext(video)[0],
+            "videoSource": video,
+            "rois": [{"name": "Full Frame", "type": "Traffic",
+                      "points": [[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]]}],
+        })
+    return cameras
+
+
+def run_camera(camera_config, detection_model, num_frames, warmup, motion_gating=False, two_tier=False):
+    """
+    Feeds one video through CameraAnalyzer at full speed and returns its timings. The motion gate
+    and two-tier analysis are off by default: consecutive video frames barely differ, so the gate
+    would mostly measure skipped ticks rather than the pipeline.
+    """
+    camera_name = camera_config.get('name', 'Unknown')
+    analyzer = CameraAnalyzer(camera_name, camera_config.get('rois', []), detection_model, motion_gating, two_tier)
+    sender = NullSender()
+    timer = StageTimer()
+
+    cap = cv2.VideoCapture(os.path.join(VIDEO_DIR, camera_config.get('videoSource', '')))
+    if not cap.isOpened():
+        print(f"[{camera_name}] Error: Could not open video source.")
+        return None
+
+    analyzed = 0
+    start = None
+    while analyzed < num_frames + warmup:
+        if analyzed == warmup:
+            # Throw away the warm-up ticks (model first-call cost)
+            timer = StageTimer()
+            start = time.perf_counter()
+
+        decode_start = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # Loop the video
+            continue
+        timer.record('decode', time.perf_counter() - decode_start)
+
+        result = analyzer.analyze(frame, timer)
+        if result is None:
+            continue
+        payload, jpeg_bytes = result
+        with timer.stage('send'):
+            submit_payload(sender, payload, jpeg_bytes)
+        analyzed += 1
+    elapsed = time.perf_counter() - start
+    cap.release()
+
+    return {
+        "camera": camera_name,
+        "video": camera_config.get('videoSource'),
+        "frames": num_frames,
+        "seconds": round(elapsed, 3),
+        "fps": round(num_frames / elapsed, 3) if elapsed > 0 else None,
+        "bytes_per_payload": round(sender.bytes_sent / max(sender.sent, 1)),
+        "stages": timer.summary(),
+    }
+
+
+def print_report(result):
+    print(f"\n--- {result['camera']} ({result['video']}): {result['frames']} frames, {result['fps']} fps ---")
+    print(f"{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for stage in STAGES:
+        s = result['stages'].get(stage)
+        if s:
+            print(f"{stage:<16}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['mean_ms']:>10.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded videos through the analysis pipeline.")
+    parser.add_argument('videos', nargs='*', help="Video files in videos/ (default: all)")
+    parser.add_argument('--config', help="JSON file with camera configs (name, videoSource, rois)")
+    parser.add_argument('--frames', type=int, default=50, help="Frames to analyze per video")
+    parser.add_argument('--warmup', type=int, default=2, help="Ticks to run before measuring")
+    parser.add_argument('--output', default="bench_results.json", help="Where to write the results JSON")
+    parser.add_argument('--motion-gating', action='store_true', help="Let the motion gate skip inference (off: comparable runs)")
+    parser.add_argument('--two-tier', action='store_true', help="Include two-tier analysis' coarse calibration")
+    parser.add_argument('--slice-cache', action='store_true', help="Reuse model output for unchanged slices (off: comparable runs)")
+    args = parser.parse_args()
+
+    cameras = load_camera_configs(args)
+    if not cameras:
+        print("--- ❌ ERROR: No videos to benchmark. ---")
+        sys.exit(1)
+
+    # Replayed frames mostly hit the slice cache, which would hide the model's own cost
+    detection_model = LocalDetectionModel(slice_caching=args.slice_cache)
+    results = []
+    for camera_config in cameras:
+        result = run_camera(camera_config, detection_model, args.frames, args.warmup, args.motion_gating, args.two_tier)
+        if result:
+            print_report(result)
+            results.append(result)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "device": detection_model.device,
+            "opencv": cv2.__version__,
+            "motion_gating": args.motion_gating,
+            "two_tier": args.two_tier,
+            "slice_cache": args.slice_cache,
+            "results": results,
+        }, f, indent=2)
+    print(f"\n--- ✅ Results written to {args.output} ---")
@@ -59,32 +59,78 @@
 
 
 # python-service/bridge.py
-import socketio
-import serial
+import argparse
+import threading
 import time
 
+import socketio
+
+from serial_writer import BAUD_RATE, SerialWriter
+from timing import StageTimer
+
 # --- CONFIGURATION ---
 # IMPORTANT: Change this to the port name you found in the step above
 ARDUINO_PORT = "/dev/tty.usbmodem141011" # For macOS, e.g., /dev/tty.usbmodemXXXX
 # ARDUINO_PORT = "COM3"  # For Windows, e.g., COM3, COM4, etc.
-BAUD_RATE = 9600
 SERVER_URL = "http://localhost:5001"
 # --- ADD THE REAL INTERSECTION ID ---
 REAL_INTERSECTION_ID = "68bf113329a3d66abae0fd7c" # Must match server/cityState.js
-
-# --- SERIAL CONNECTION SETUP ---
-try:
-    print(f"Attempting to connect to Arduino on port {ARDUINO_PORT}...")
-    arduino = serial.Serial(port=ARDUINO_PORT, baudrate=BAUD_RATE, timeout=.1)
-    print("✅ Successfully connected to Arduino.")
-except serial.SerialException as e:
-    print(f"❌ Error: Could not connect to Arduino on port '{ARDUINO_PORT}'.")
-    print("Please check the port name and ensure the Arduino is connected.")
-    print(f"Details: {e}")
-    exit()
+LATENCY_REPORT_INTERVAL = 30  # Seconds between 'bridge-latency' reports
+LATENCY_MAX_SAMPLES = 10000   # Per hop, most recent
+
+
+# --- ACTUATION LATENCY TRACING ---
+# The server stamps each command with when its light logic decided (decidedAt) and when it was
+# emitted (emittedAt), in epoch ms. The bridge adds receivedAt, enqueuedAt and the serial write
+# times, all epoch seconds. Hops across machines are only as good as their clock sync.
+HOPS = ('server', 'socket', 'queue', 'serial_write', 'end_to_end')
+
+def parse_arduino_command(data):
+    """
+    Returns (command, trace) for an 'arduino-command' payload: either the plain 'G,R,R,R'
+    string or { command, seq, decidedAt, emittedAt }.
+    """
+    trace = {"receivedAt": time.time()}
+    if isinstance(data, dict):
+        trace["seq"] = data.get('seq')
+        trace["command"] = data['command']
+        for key in ('decidedAt', 'emittedAt'):
+            if data.get(key) is not None:
+                trace[key] = data[key] / 1000
+        return data['command'], trace
+    trace["command"] = data
+    return data, trace
+
+
+class ActuationTracer:
+    """Latency per hop from the server's light decision to the serial write, for commands that got written."""
+
+    def __init__(self, max_samples=LATENCY_MAX_SAMPLES):
+        self.timer = StageTimer(max_samples)
+        self.written = 0
+
+    def on_written(self, trace, write_started, write_done):
+        self.written += 1
+        decided, emitted = trace.get('decidedAt'), trace.get('emittedAt')
+        if decided is not None and emitted is not None:
+            self.timer.record('server', emitted - decided)
+        if emitted is not None:
+            self.timer.record('socket', trace['receivedAt'] - emitted)
+        self.timer.record('queue', write_started - trace['enqueuedAt'])
+        self.timer.record('serial_write', write_done - write_started)
+        if decided is not None:
+            self.timer.record('end_to_end', write_done - decided)
+
+    def report(self):
+        summary = self.timer.summary()
+        return {name: summary[name] for name in HOPS if name in summary}
 
 # --- WEBSOCKET CLIENT SETUP ---
 sio = socketio.Client()
+# The serial port is owned by a writer thread (see serial_writer.py), so a slow or
+# disconnected Arduino never blocks the socket.io event loop
+writer = None
+tracer = ActuationTracer()
 
 @sio.event
 def connect():
@@ -105,27 +151,47 @@ def disconnect():
 @sio.on('arduino-command')
 def on_arduino_command(data):
     """This function is called when the server sends a command."""
-    command = data + '\n' # Add a newline character for the Arduino to read
-    print(f"➡️ Received command: '{data}'. Forwarding to Arduino...")
-    try:
-        arduino.write(command.encode('utf-8')) # Send the command to the Arduino
-    except serial.SerialException as e:
-        print(f"❌ Error writing to Arduino: {e}")
-        # Optionally, you could try to reconnect here or exit.
+    command, trace = parse_arduino_command(data)
+    print(f"➡️ Received command: '{command}'. Queued for Arduino.")
+    writer.submit(command, trace)
+
+def report_latency_forever(interval=LATENCY_REPORT_INTERVAL):
+    """Logs the actuation latency histograms and sends them to the server as 'bridge-latency'."""
+    while True:
+        time.sleep(interval)
+        report = tracer.report()
+        if not report:
+            continue
+        print("⏱️ Actuation latency (ms): " + ", ".join(
+            f"{name} p50={s['p50_ms']} p99={s['p99_ms']}" for name, s in report.items()))
+        if sio.connected:
+            sio.emit('bridge-latency', {"intersectionId": REAL_INTERSECTION_ID, "writer": writer.stats(), "hops": report})
 
 # --- MAIN EXECUTION ---
-if __name__ == '__main__':
+def main():
+    global writer
+    parser = argparse.ArgumentParser(description="Forwards the server's light commands to the Arduino.")
+    parser.add_argument('--port', default=ARDUINO_PORT, help="Serial port (e.g. one printed by fake_serial.py)")
+    parser.add_argument('--baud', type=int, default=BAUD_RATE)
+    parser.add_argument('--server', default=SERVER_URL)
+    args = parser.parse_args()
+
+    writer = SerialWriter(args.port, args.baud, on_written=tracer.on_written).start()
+    threading.Thread(target=report_latency_forever, name="latency-report", daemon=True).start()
     try:
         print("Attempting to connect to WebSocket server...")
-        sio.connect(SERVER_URL)
+        sio.connect(args.server)
         sio.wait() # Wait indefinitely for events
     except socketio.exceptions.ConnectionError as e:
-        print(f"❌ Error: Could not connect to the WebSocket server at {SERVER_URL}.")
+        print(f"❌ Error: Could not connect to the WebSocket server at {args.server}.")
         print(f"Please ensure the Node.js server is running.")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
     finally:
-        if arduino and arduino.is_open:
-            arduino.close()
-            print("Serial port closed.")
-        print("Bridge script shutting down.")
\ No newline at end of file
+        writer.stop()
+        print("Serial port closed.")
+        print(f"Serial writer stats: {writer.stats()}")
+        print("Bridge script shutting down.")
+
+if __name__ == '__main__':
+    main()
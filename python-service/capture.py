@@ -0,0 +1,93 @@
+# python-service/capture.py
+
+import threading
+import time
+
+import cv2
+
+STREAM_PREFIXES = ('rtsp://', 'rtmp://', 'http://', 'https://')
+DEFAULT_FPS = 25
+
+
+class FrameGrabber:
+    """
+    Reads a video source on its own thread. Frames are only grabbed (demuxed) to keep the stream
+    moving; a frame is decoded with retrieve() only when read() asks for one, and handed over
+    through a single-slot buffer. File sources are paced to their native FPS and loop at the end.
+    """
+
+    def __init__(self, source, camera_name, loop=True):
+        self.source = source
+        self.camera_name = camera_name
+        self.loop = loop
+        self.cap = cv2.VideoCapture(source)
+        self.is_file = not str(source).startswith(STREAM_PREFIXES)
+
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0
+        self.frame_period = 1.0 / (fps if fps and fps > 0 else DEFAULT_FPS)
+
+        self.frames_grabbed = 0
+        self.frames_decoded = 0
+
+        self._lock = threading.Lock()
+        self._frame = None          # The single slot
+        self._wanted = threading.Event()
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"capture-{self.camera_name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def read(self, timeout=5.0):
+        """Returns the next decoded frame, or None if the source produced nothing within 'timeout'."""
+        self._ready.clear()
+        self._wanted.set()
+        if not self._ready.wait(timeout):
+            self._wanted.clear()
+            return None
+        with self._lock:
+            frame, self._frame = self._frame, None
+        return frame
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.cap.release()
+
+    def _run(self):
+        next_frame_time = time.monotonic()
+        while not self._stopped.is_set():
+            if not self.cap.grab():
+                if self.is_file and self.loop:
+                    print(f"[{self.camera_name}] End of video stream. Restarting...")
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # Loop the video
+                else:
+                    time.sleep(0.1) # Live stream hiccup, try again
+                continue
+            self.frames_grabbed += 1
+
+            # Only pay for decoding when somebody is waiting for a frame
+            if self._wanted.is_set():
+                ret, frame = self.cap.retrieve()
+                if ret:
+                    self.frames_decoded += 1
+                    with self._lock:
+                        self._frame = frame
+                    self._wanted.clear()
+                    self._ready.set()
+
+            # Files would otherwise be read as fast as the CPU allows
+            if self.is_file:
+                next_frame_time += self.frame_period
+                delay = next_frame_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -1.0:
+                    next_frame_time = time.monotonic() # Fell far behind; don't try to catch up
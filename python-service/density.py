@@ -0,0 +1,80 @@
+# python-service/density.py
+
+import math
+
+# --- Configuration ---
+DENSITY_SMOOTHING_SECONDS = 2.0   # EWMA time constant: a step change is ~63% through after this long
+OFFSET_SMOOTHING_SECONDS = 30.0   # Time constant of the coarse-vs-full calibration per ROI
+
+
+class EWMA:
+    """
+    An incremental exponentially weighted moving average over irregularly spaced samples:
+    the weight of a new sample grows with the time since the previous one.
+    """
+
+    __slots__ = ('time_constant', 'value', 'updated_at')
+
+    def __init__(self, time_constant):
+        self.time_constant = time_constant
+        self.value = None
+        self.updated_at = None
+
+    def update(self, sample, now):
+        if self.value is None:
+            self.value = float(sample)
+        else:
+            alpha = 1 - math.exp(-max(now - self.updated_at, 0.0) / self.time_constant)
+            self.value += alpha * (sample - self.value)
+        self.updated_at = now
+        return self.value
+
+
+class DensityTracker:
+    """
+    Per-ROI traffic density from two tiers of analysis. Full ticks (SAHI) give accurate densities;
+    intermediate ticks give coarse ones from one whole-frame prediction, which misses small,
+    distant vehicles. Each full tick also measures its frame coarsely, and the running difference
+    per ROI corrects later coarse values. Every value, from either tier, goes through a per-ROI EWMA.
+    """
+
+    def __init__(self, smoothing_seconds=DENSITY_SMOOTHING_SECONDS, offset_seconds=OFFSET_SMOOTHING_SECONDS):
+        self.smoothing_seconds = smoothing_seconds
+        self.offset_seconds = offset_seconds
+        self.reset()
+
+    def reset(self):
+        """Forgets everything (e.g. after an ROI change)."""
+        self.smoothed = {}      # roi_name -> EWMA of the density
+        self.offsets = {}       # roi_name -> EWMA of (full - coarse)
+        self.last_full = {}     # roi_name -> raw density of the latest full tick
+
+    def _smooth(self, densities, now):
+        for name, density in densities.items():
+            self.smoothed.setdefault(name, EWMA(self.smoothing_seconds)).update(density, now)
+        return self.values()
+
+    def update_full(self, densities, now, coarse=None):
+        """A full tick's densities; 'coarse' is the same frame's coarse densities, for calibration."""
+        self.last_full = dict(densities)
+        if coarse is not None:
+            for name, density in densities.items():
+                if name in coarse:
+                    self.offsets.setdefault(name, EWMA(self.offset_seconds)).update(density - coarse[name], now)
+        return self._smooth(densities, now)
+
+    def update_coarse(self, coarse, now):
+        """An intermediate tick's coarse densities, corrected by each ROI's calibration offset."""
+        corrected = {}
+        for name, density in coarse.items():
+            offset = self.offsets[name].value if name in self.offsets else 0.0
+            corrected[name] = min(max(density + offset, 0.0), 100.0)
+        return self._smooth(corrected, now)
+
+    def update_unchanged(self, now):
+        """An intermediate tick on a scene that hasn't changed since the last full tick."""
+        return self._smooth(self.last_full, now)
+
+    def values(self):
+        """{ roi_name: smoothed density }."""
+        return {name: ewma.value for name, ewma in self.smoothed.items()}
@@ -0,0 +1,84 @@
+# python-service/detections.py
+
+import numpy as np
+
+
+class ClassTable:
+    """Maps the model's class names to ids once, with per-id lookup arrays for filtering and weights."""
+
+    def __init__(self, category_mapping, allowed_classes, pollution_weights, person_class='person'):
+        # category_mapping is the model's { "0": "lmv", "1": "bus", ... }
+        ids = {name: int(class_id) for class_id, name in category_mapping.items()}
+        size = max(ids.values(), default=-1) + 1
+
+        self.ids = ids
+        self.names = [''] * size
+        for name, class_id in ids.items():
+            self.names[class_id] = name
+
+        self.allowed = np.zeros(size, dtype=bool)
+        self.pollution_weights = np.zeros(size, dtype=np.int32)
+        for name, class_id in ids.items():
+            self.allowed[class_id] = name in allowed_classes
+            self.pollution_weights[class_id] = pollution_weights.get(name, 0)
+
+        self.person_id = ids.get(person_class, -1)
+
+
+class Detections:
+    """Columnar detections: (N, 4) float32 x1,y1,x2,y2 boxes, int class ids and float32 scores."""
+
+    __slots__ = ('boxes', 'class_ids', 'scores')
+
+    def __init__(self, boxes, class_ids, scores):
+        self.boxes = boxes
+        self.class_ids = class_ids
+        self.scores = scores
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.zeros((0, 4), dtype=np.float32),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.float32)
+        )
+
+    @classmethod
+    def from_object_predictions(cls, object_predictions):
+        """Converts SAHI's ObjectPrediction list in a single pass."""
+        count = len(object_predictions)
+        if count == 0:
+            return cls.empty()
+
+        boxes = np.empty((count, 4), dtype=np.float32)
+        class_ids = np.empty(count, dtype=np.int32)
+        scores = np.empty(count, dtype=np.float32)
+        for i, p in enumerate(object_predictions):
+            boxes[i] = (p.bbox.minx, p.bbox.miny, p.bbox.maxx, p.bbox.maxy)
+            class_ids[i] = p.category.id
+            scores[i] = p.score.value
+        return cls(boxes, class_ids, scores)
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    def filter(self, mask):
+        """Returns the detections selected by a bool mask (or index array)."""
+        return Detections(self.boxes[mask], self.class_ids[mask], self.scores[mask])
+
+    def int_boxes(self):
+        return self.boxes.astype(np.int32)
+
+    def centers(self):
+        """Integer bbox centers, shape (N, 2)."""
+        return np.stack([
+            (self.boxes[:, 0] + self.boxes[:, 2]) / 2,
+            (self.boxes[:, 1] + self.boxes[:, 3]) / 2
+        ], axis=1).astype(np.int32)
+
+    def top_anchors(self):
+        """Integer (center x, top y) points, shape (N, 2)."""
+        return np.stack([
+            (self.boxes[:, 0] + self.boxes[:, 2]) / 2,
+            self.boxes[:, 1]
+        ], axis=1).astype(np.int32)
@@ -66,16 +66,42 @@
 
 
 # python-service/dummy_violator.py
+#
+# Usage:
+#   python dummy_violator.py                                   # one fake violation every 30-60 seconds
+#   python dummy_violator.py --load --rate 2000 --concurrency 200 --duration 60
+#   python dummy_violator.py --load --mix violation=1,violation_bulk=1,density=8 --output load_results.json
 
-import requests
-import time
+import argparse
+import asyncio
+import base64
+import collections
+import json
+import os
 import random
+import time
+import uuid
+
+import cv2
+import numpy as np
+import requests
+
+from transport import BINARY_CONTENT_TYPE, encode_frame, pack_frame_payload
+
+try:
+    import aiohttp
+except ImportError: # Only needed for --load
+    aiohttp = None
 
 # --- Configuration ---
-API_ENDPOINT = "http://localhost:5001/api/violations"
+SERVER_URL = "http://localhost:5001"
+API_ENDPOINT = f"{SERVER_URL}/api/violations"
 REAL_INTERSECTION_ID = "68bf113329a3d66abae0fd7c"
 REAL_INTERSECTION_NAME = "Main & First (Real)"
 CAMERA_NAMES = ["North", "South", "East", "West"]
+VIDEO_DIR = "videos"
+BULK_SIZE = 20          # Violations per violation_bulk request
+DEFAULT_MIX = "violation=1,density=4"
 
 # A public-domain image of a car for "evidence"
 # This is a real photo of a car running a red light.
@@ -89,43 +115,245 @@ def generate_fake_plate():
     digits2 = "".join(random.choices("0123456789", k=4))
     return f"{letters1} {digits1} {letters2} {digits2}"
 
-print("--- 🚓 Dummy Violator Script Started ---")
-print("This will create a new fake violation every 30-60 seconds.")
-print(f"Posting data to: {API_ENDPOINT}")
-print("Press Ctrl+C to stop.")
-
-while True:
-    try:
-        # 1. Wait for a random time
-        sleep_time = random.randint(30, 60)
-        time.sleep(sleep_time)
-        
-        # 2. Create the fake violation data
-        fake_plate = generate_fake_plate()
-        random_camera = random.choice(CAMERA_NAMES)
-        
-        payload = {
-            "intersectionId": REAL_INTERSECTION_ID,
-            "intersectionName": REAL_INTERSECTION_NAME,
-            "cameraName": random_camera,
-            "licensePlate": fake_plate,
-            "imageUrl": IMAGE_URL
-        }
-        
-        # 3. Send the POST request to our server
-        response = requests.post(API_ENDPOINT, json=payload)
-        
-        if response.status_code == 201: # 201 = Created
-            print(f"✅ Successfully reported violation for plate: {fake_plate} at {random_camera}")
-        else:
-            print(f"❌ Error reporting violation. Status: {response.status_code}, {response.text}")
+def fake_violation():
+    return {
+        "intersectionId": REAL_INTERSECTION_ID,
+        "intersectionName": REAL_INTERSECTION_NAME,
+        "cameraName": random.choice(CAMERA_NAMES),
+        "licensePlate": generate_fake_plate(),
+        "imageUrl": IMAGE_URL,
+        "idempotencyKey": uuid.uuid4().hex,
+    }
+
+
+def run_dummy_violator():
+    """The original mode: one fake violation every 30-60 seconds."""
+    print("--- 🚓 Dummy Violator Script Started ---")
+    print("This will create a new fake violation every 30-60 seconds.")
+    print(f"Posting data to: {API_ENDPOINT}")
+    print("Press Ctrl+C to stop.")
+
+    while True:
+        try:
+            # 1. Wait for a random time
+            sleep_time = random.randint(30, 60)
+            time.sleep(sleep_time)
             
-    except requests.exceptions.ConnectionError:
-        print("❌ Connection failed. Is the Node.js server running?")
-        time.sleep(10) # Wait 10 seconds before retrying
-        
-    except KeyboardInterrupt:
-        print("\nStopping the dummy violator script. Goodbye.")
-        break
+            # 2. Create the fake violation data
+            payload = fake_violation()
+            
+            # 3. Send the POST request to our server
+            response = requests.post(API_ENDPOINT, json=payload)
+            
+            if response.status_code == 201: # 201 = Created
+                print(f"✅ Successfully reported violation for plate: {payload['licensePlate']} at {payload['cameraName']}")
+            else:
+                print(f"❌ Error reporting violation. Status: {response.status_code}, {response.text}")
+                
+        except requests.exceptions.ConnectionError:
+            print("❌ Connection failed. Is the Node.js server running?")
+            time.sleep(10) # Wait 10 seconds before retrying
+            
+        except KeyboardInterrupt:
+            print("\nStopping the dummy violator script. Goodbye.")
+            break
+
+
+# --- Load generation ---
+
+def load_sample_jpeg(frame_size):
+    """
+    An annotated-frame-sized JPEG, encoded the way main.py sends it: the first frame of a video
+    in videos/ when there is one, otherwise a synthetic frame with camera-like detail.
+    """
+    for video in sorted(os.listdir(VIDEO_DIR)) if os.path.isdir(VIDEO_DIR) else []:
+        cap = cv2.VideoCapture(os.path.join(VIDEO_DIR, video))
+        ok, frame = cap.read()
+        cap.release()
+        if ok:
+            return encode_frame(frame)
+    width, height = frame_size
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+    frame = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+    return encode_frame(frame)
+
+
+def density_metrics():
+    return {
+        "cameraName": random.choice(CAMERA_NAMES),
+        "densities": {"default": random.randint(0, 100)},
+        "pollutionScore": random.randint(0, 500),
+        "pedestrianWaiting": random.random() < 0.1,
+    }
+
+
+def build_request(endpoint, frame):
+    """Returns (method, url, kwargs) for one request of the given mix endpoint."""
+    if endpoint == 'violation':
+        return 'POST', API_ENDPOINT, {"json": fake_violation()}
+    if endpoint == 'violation_bulk':
+        return 'POST', f"{API_ENDPOINT}/bulk", {"json": {"violations": [fake_violation() for _ in range(BULK_SIZE)]}}
+    data_url = f"{SERVER_URL}/api/intersections/{REAL_INTERSECTION_ID}/data"
+    if endpoint == 'density':
+        body = pack_frame_payload(density_metrics(), frame['jpeg'])
+        return 'POST', data_url, {"data": body, "headers": {"Content-Type": BINARY_CONTENT_TYPE}}
+    if endpoint == 'density_json':
+        payload = {**density_metrics(), "annotatedFrame": frame['base64']}
+        return 'POST', data_url, {"json": payload}
+    if endpoint == 'list_violations':
+        return 'GET', API_ENDPOINT, {}
+    raise ValueError(f"Unknown endpoint '{endpoint}'")
+
+
+ENDPOINTS = ('violation', 'violation_bulk', 'density', 'density_json', 'list_violations')
+
+
+def parse_mix(mix):
+    """'violation=1,density=4' -> ([endpoints], [weights])."""
+    endpoints, weights = [], []
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}' in --mix (choose from {', '.join(ENDPOINTS)})")
+        endpoints.append(name)
+        weights.append(float(weight or 1))
+    return endpoints, weights
+
+
+class LoadStats:
+    """Per-endpoint latency samples and outcome counts."""
+
+    def __init__(self):
+        self.latency = collections.defaultdict(list)   # From the scheduled send time (includes client queueing)
+        self.service = collections.defaultdict(list)   # From the actual send time
+        self.outcomes = collections.defaultdict(collections.Counter)
+        self.bytes_sent = collections.Counter()
+
+    def record(self, endpoint, scheduled, started, finished, outcome, size):
+        self.latency[endpoint].append(finished - scheduled)
+        self.service[endpoint].append(finished - started)
+        self.outcomes[endpoint][outcome] += 1
+        self.bytes_sent[endpoint] += size
+
+    def report(self, elapsed):
+        report = {}
+        for endpoint, outcomes in sorted(self.outcomes.items()):
+            total = sum(outcomes.values())
+            errors = sum(count for outcome, count in outcomes.items() if not outcome.startswith('2'))
+            latency = np.asarray(self.latency[endpoint]) * 1000
+            service = np.asarray(self.service[endpoint]) * 1000
+            p50, p90, p99 = np.percentile(latency, [50, 90, 99])
+            report[endpoint] = {
+                "requests": total,
+                "rps": round(total / elapsed, 1),
+                "error_rate": round(errors / total, 4),
+                "outcomes": dict(outcomes),
+                "p50_ms": round(float(p50), 2),
+                "p90_ms": round(float(p90), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(latency.max()), 2),
+                "service_p50_ms": round(float(np.percentile(service, 50)), 2),
+                "service_p99_ms": round(float(np.percentile(service, 99)), 2),
+                "avg_request_bytes": round(self.bytes_sent[endpoint] / total),
+            }
+        return report
+
+
+async def send_one(session, semaphore, stats, endpoint, scheduled, frame):
+    method, url, kwargs = build_request(endpoint, frame)
+    if 'json' in kwargs: # Serialize once, here, so the body size is known
+        kwargs = {"data": json.dumps(kwargs['json']).encode('utf-8'), "headers": {"Content-Type": "application/json"}}
+    size = len(kwargs.get('data') or b'')
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                await response.read()
+                outcome = str(response.status)
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+        except aiohttp.ClientError as e:
+            outcome = type(e).__name__
+    stats.record(endpoint, scheduled, started, time.perf_counter(), outcome, size)
+
+
+async def run_load(args):
+    """
+    Open-loop load: requests are scheduled at --rate regardless of how fast the server answers,
+    with at most --concurrency in flight over one pooled keep-alive session. Latency is measured
+    from each request's scheduled time, so a server that falls behind shows up in the percentiles.
+    """
+    endpoints, weights = parse_mix(args.mix)
+    jpeg_bytes = load_sample_jpeg(args.frame_size)
+    frame = {"jpeg": jpeg_bytes, "base64": base64.b64encode(jpeg_bytes).decode('utf-8')} # Encoded once
+    stats = LoadStats()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    print(f"--- 🚓 Load test: {args.rate} req/s for {args.duration}s, concurrency {args.concurrency}, "
+          f"mix {args.mix}, frame {len(jpeg_bytes) // 1024} KB ---")
+    connector = aiohttp.TCPConnector(limit=args.concurrency, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(SERVER_URL, connector=connector, timeout=timeout) as session:
+        tasks = set()
+        start = time.perf_counter()
+        sent = 0
+        total = int(args.rate * args.duration)
+        while sent < total:
+            # Launch everything that is due; sleeping per request can't keep up at thousands/s
+            now = time.perf_counter()
+            due = min(int((now - start) * args.rate) + 1, total)
+            for _ in range(due - sent):
+                scheduled = start + sent / args.rate
+                endpoint = random.choices(endpoints, weights)[0]
+                task = asyncio.create_task(send_one(session, semaphore, stats, endpoint, scheduled, frame))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                sent += 1
+            await asyncio.sleep(max(start + sent / args.rate - time.perf_counter(), 0))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return stats.report(elapsed), elapsed
+
+
+def print_load_report(report, elapsed):
+    print(f"\n--- Finished in {elapsed:.1f}s ---")
+    print(f"{'endpoint':<18}{'requests':>9}{'rps':>9}{'errors':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for endpoint, r in report.items():
+        print(f"{endpoint:<18}{r['requests']:>9}{r['rps']:>9}{r['error_rate']:>9.2%}"
+              f"{r['p50_ms']:>9}{r['p90_ms']:>9}{r['p99_ms']:>9}{r['max_ms']:>9}")
+        failures = {k: v for k, v in r['outcomes'].items() if not k.startswith('2')}
+        if failures:
+            print(f"{'':<18}failures: {failures}")
+
+
+def parse_frame_size(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fake violations for the dashboard, or load against the whole server.")
+    parser.add_argument('--load', action='store_true', help="Run the asyncio load generator instead")
+    parser.add_argument('--rate', type=float, default=500, help="Requests per second")
+    parser.add_argument('--concurrency', type=int, default=100, help="Maximum requests in flight")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Weighted endpoints: {', '.join(ENDPOINTS)}")
+    parser.add_argument('--frame-size', type=parse_frame_size, default=(1920, 1080),
+                        help="Camera frame size for synthetic density payloads (when videos/ is empty)")
+    parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout (s)")
+    parser.add_argument('--output', help="Optional JSON file for the report")
+    args = parser.parse_args()
 
+    if not args.load:
+        run_dummy_violator()
+    elif aiohttp is None:
+        print("--- ❌ ERROR: --load needs aiohttp (pip install aiohttp). ---")
+    else:
+        report, elapsed = asyncio.run(run_load(args))
+        print_load_report(report, elapsed)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({"args": {k: v for k, v in vars(args).items()}, "seconds": round(elapsed, 3), "endpoints": report}, f, indent=2)
+            print(f"--- ✅ Results written to {args.output} ---")
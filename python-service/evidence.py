@@ -0,0 +1,93 @@
+# python-service/evidence.py
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+# --- Configuration ---
+EVIDENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "evidence")
+# The Node.js server serves EVIDENCE_DIR at /evidence (see server/server.js)
+EVIDENCE_BASE_URL = "http://localhost:5001/evidence"
+CONTEXT_MARGIN = 0.25   # Extra context around the vehicle, as a fraction of its bbox size
+JPEG_QUALITY = 90
+EVIDENCE_WORKERS = 2
+# Handed to the callback when a crop can't be stored, so the violation itself is still reported
+MISSING_EVIDENCE_URL = f"{EVIDENCE_BASE_URL}/missing.jpg"
+
+
+def crop_with_margin(frame, bbox, margin=CONTEXT_MARGIN):
+    """Copies the bbox region plus a context margin out of the frame (clipped to the frame)."""
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = (float(v) for v in bbox)
+    pad_x = (x2 - x1) * margin
+    pad_y = (y2 - y1) * margin
+    x1, y1 = max(int(x1 - pad_x), 0), max(int(y1 - pad_y), 0)
+    x2, y2 = min(int(x2 + pad_x), width), min(int(y2 + pad_y), height)
+    # Copy, so the caller is free to reuse or overwrite the frame
+    return frame[y1:y2, x1:x2].copy()
+
+
+class EvidenceStore:
+    """
+    Encodes evidence crops on a thread pool and writes them to a content-addressed store on disk
+    (evidence/<first 2 hex>/<sha256>.jpg). Identical crops are stored once.
+    """
+
+    def __init__(self, root=EVIDENCE_DIR, base_url=EVIDENCE_BASE_URL, workers=EVIDENCE_WORKERS):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evidence")
+
+    def submit(self, frame, bbox, callback=None):
+        """
+        Crops the vehicle (the only work done on the caller's thread) and queues the rest.
+        'callback(image_url)' runs on the pool once the file is on disk, or with MISSING_EVIDENCE_URL
+        if encoding or writing it failed. Returns a Future.
+        """
+        crop = crop_with_margin(frame, bbox)
+        future = self._pool.submit(self._store, crop)
+        if callback:
+            future.add_done_callback(lambda f: self._run_callback(f, callback))
+        return future
+
+    def _store(self, crop):
+        ok, buffer = cv2.imencode('.jpg', crop, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            raise ValueError("Could not encode evidence crop")
+        data = buffer.tobytes()
+        digest = hashlib.sha256(data).hexdigest()
+        relative_path = f"{digest[:2]}/{digest}.jpg"
+        path = os.path.join(self.root, relative_path)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a half-written file is never served
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return f"{self.base_url}/{relative_path}"
+
+    @staticmethod
+    def _run_callback(future, callback):
+        try:
+            image_url = future.result()
+        except Exception as e:
+            print(f"❌ Error saving evidence: {e}. Reporting the violation without it.")
+            image_url = MISSING_EVIDENCE_URL
+        callback(image_url)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+_default_store = None
+
+def get_evidence_store():
+    """The process-wide EvidenceStore, created on first use."""
+    global _default_store
+    if _default_store is None:
+        _default_store = EvidenceStore()
+    return _default_store
@@ -0,0 +1,72 @@
+# python-service/fake_serial.py
+# A pty-backed stand-in for the Arduino, so bridge.py can be run and benchmarked without hardware.
+#
+# Usage:
+#   python fake_serial.py                  # prints a port name, then every line it receives
+#   python bridge.py --port /dev/pts/N     # in another terminal
+
+import os
+import threading
+import time
+import tty
+
+BAUD_RATE = 9600
+
+
+class FakeSerialDevice:
+    """
+    The Arduino end of a pseudo-terminal. Open 'port_name' like a real serial port; every line
+    written to it is recorded with its arrival time. Reads are paced to the baud rate (10 bits
+    per byte), so a writer that outpaces the port backs up like it would on the real board.
+    """
+
+    def __init__(self, baud_rate=BAUD_RATE, on_line=None):
+        self.baud_rate = baud_rate
+        self.on_line = on_line
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port_name = os.ttyname(self._slave)
+        self.lines = []             # [(perf_counter time, line)]
+        self.bytes_received = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._read, name="fake-serial", daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        buffer = b''
+        while self._running:
+            try:
+                chunk = os.read(self._master, 64)
+            except OSError:
+                return # Closed
+            if not chunk:
+                return
+            if self.baud_rate:
+                time.sleep(len(chunk) * 10 / self.baud_rate) # Time on the wire
+            now = time.perf_counter()
+            self.bytes_received += len(chunk)
+            buffer += chunk
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                line = line.decode('utf-8', 'replace')
+                self.lines.append((now, line))
+                if self.on_line:
+                    self.on_line(now, line)
+
+    def close(self):
+        self._running = False
+        for fd in (self._slave, self._master):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+if __name__ == '__main__':
+    device = FakeSerialDevice(on_line=lambda t, line: print(f"⬅️ Arduino received: '{line}'"))
+    print(f"--- 🔌 Fake Arduino listening on {device.port_name} ({device.baud_rate} baud) ---")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        device.close()
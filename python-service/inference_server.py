@@ -0,0 +1,170 @@
+# python-service/inference_server.py
+
+import queue
+import random
+import time
+
+import torch
+from sahi import AutoDetectionModel
+
+from sliced_inference import SliceCache, predict_sliced_batch
+from timing import NULL_TIMER
+
+# --- Configuration ---
+MODEL_PATH = 'models/bestn.pt'
+CONFIDENCE_THRESHOLD = 0.3
+MAX_BATCH_SIZE = 8        # Most frames handled in one batch
+MAX_BATCH_WAIT = 0.05     # Seconds to wait for more frames once the first one arrives
+SLICE_CACHING = True      # Reuse the model's output for slices that haven't changed (see SliceCache)
+
+
+def load_detection_model():
+    """Loads the YOLOv8 model through SAHI on the best available device."""
+    device = "mps" if torch.backends.mps.is_available() else "cpu"
+    detection_model = AutoDetectionModel.from_pretrained(
+        model_type='yolov8', model_path=MODEL_PATH,
+        confidence_threshold=CONFIDENCE_THRESHOLD, device=device
+    )
+    return detection_model, device
+
+
+def collect_batch(request_queue, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_BATCH_WAIT):
+    """
+    Blocks for the first request, then keeps taking requests until the batch is full
+    or max_wait has passed. Returns None when a shutdown request (None) is received.
+    """
+    first = request_queue.get()
+    if first is None:
+        return None
+
+    batch = [first]
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_batch_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            request = request_queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if request is None:
+            # Finish this batch, then stop
+            request_queue.put(None)
+            break
+        batch.append(request)
+    return batch
+
+
+def predict_batch(frames, detection_model, slices_per_frame=None, timer=NULL_TIMER, caches=None, with_coarse=False):
+    """Sliced prediction for a batch of frames; the slices of all frames share the forward passes."""
+    return predict_sliced_batch(frames, detection_model, slices_per_frame, timer, caches, with_coarse)
+
+
+def run_inference_server(request_queue, result_queues, ready_queue):
+    """
+    The inference server process. It owns the only copy of the model and serves every camera.
+    Requests are (route_key, request_id, frame, slices, camera_name); results go back on
+    result_queues[route_key] as (request_id, Detections, coarse Detections, slice cache stats), the
+    coarse ones from the full-frame prediction alone. The route key is the camera name unless the
+    manager assigns slots.
+    """
+    detection_model, device = load_detection_model()
+    # The category mapping lets workers build their ClassTable without loading the model
+    ready_queue.put(dict(detection_model.category_mapping))
+    print(f"[InferenceServer] Model loaded. Device: {device}, serving up to {len(result_queues)} cameras.")
+    # One slice cache per route, started over when a slot is handed to a different camera
+    slice_caches = {} # route_key -> (camera_name, SliceCache)
+
+    while True:
+        batch = collect_batch(request_queue)
+        if batch is None:
+            print("[InferenceServer] Shutting down.")
+            return
+
+        caches = None
+        if SLICE_CACHING:
+            for route_key, _, _, _, camera_name in batch:
+                if slice_caches.get(route_key, (None,))[0] != camera_name:
+                    slice_caches[route_key] = (camera_name, SliceCache())
+            caches = [slice_caches[route_key][1] for route_key, _, _, _, _ in batch]
+
+        try:
+            results = predict_batch(
+                [frame for _, _, frame, _, _ in batch], detection_model,
+                [slices for _, _, _, slices, _ in batch], caches=caches, with_coarse=True
+            )
+        except Exception as e:
+            print(f"[InferenceServer] Batch of {len(batch)} failed: {e}")
+            results = [(None, None)] * len(batch)
+
+        for (route_key, request_id, _, _, _), (detections, coarse) in zip(batch, results):
+            stats = slice_caches[route_key][1].stats() if SLICE_CACHING else {}
+            result_queues[route_key].put((request_id, detections, coarse, stats))
+
+
+class LocalDetectionModel:
+    """A model owned by the camera worker itself (the default, one model per process)."""
+
+    def __init__(self, slice_caching=SLICE_CACHING):
+        self.detection_model, self.device = load_detection_model()
+        self.category_mapping = self.detection_model.category_mapping
+        self.slice_cache = SliceCache() if slice_caching else None
+
+    def predict(self, frame, slices=None, timer=NULL_TIMER, with_coarse=False):
+        """
+        Returns the Detections for a frame, running only 'slices' if given. With 'with_coarse',
+        returns (Detections, coarse Detections from the full-frame prediction alone).
+        """
+        caches = [self.slice_cache] if self.slice_cache else None
+        return predict_batch([frame], self.detection_model, [slices], timer, caches, with_coarse)[0]
+
+    def slice_cache_stats(self):
+        """{ hits, misses, expired, evictions, hit_rate } of this camera's slice cache."""
+        return self.slice_cache.stats() if self.slice_cache else {}
+
+
+class RemoteDetectionModel:
+    """The camera worker's handle on the inference server. Submits frames and waits for the result."""
+
+    def __init__(self, camera_name, request_queue, result_queue, category_mapping, route_key=None):
+        self.camera_name = camera_name
+        self.route_key = camera_name if route_key is None else route_key # Which result queue answers
+        self.request_queue = request_queue
+        self.result_queue = result_queue
+        self.category_mapping = category_mapping
+        self.device = "inference-server"
+        self._slice_cache_stats = {} # The server's cache stats for this camera, as of the last answer
+        # Random start: a restarted worker may reuse a result queue that still gets a late answer
+        self._next_request_id = random.getrandbits(48)
+
+    def predict(self, frame, slices=None, timer=NULL_TIMER, with_coarse=False, timeout=60):
+        """
+        Returns the Detections for a frame, or None if the server failed or timed out. With
+        'with_coarse', returns (Detections, coarse Detections), or (None, None).
+        """
+        with timer.stage('inference'):
+            detections, coarse = self._request(frame, slices, timeout)
+        return (detections, coarse) if with_coarse else detections
+
+    def _request(self, frame, slices, timeout):
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        self.request_queue.put((self.route_key, request_id, frame, slices, self.camera_name))
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None, None
+            try:
+                result_id, detections, coarse, stats = self.result_queue.get(timeout=remaining)
+            except queue.Empty:
+                return None, None
+            # Drop late answers to requests that already timed out
+            if result_id == request_id:
+                self._slice_cache_stats = stats
+                return detections, coarse
+
+    def slice_cache_stats(self):
+        """{ hits, misses, expired, evictions, hit_rate } of the server's slice cache for this camera."""
+        return self._slice_cache_stats
@@ -3,14 +3,24 @@
 import cv2
 import numpy as np
 import requests
-import torch
-import json
 import time
 import base64
+import queue
 import sys
-from multiprocessing import Process
-from sahi import AutoDetectionModel
-from sahi.predict import get_sliced_prediction
+import argparse
+from multiprocessing import Queue
+
+from capture import FrameGrabber
+from density import DensityTracker
+from detections import ClassTable
+from inference_server import LocalDetectionModel, RemoteDetectionModel, run_inference_server
+from motion import MotionGate
+from metrics import MetricsAggregator, MetricsPusher, WorkerMetrics, install_profiler_hook
+from rois import ROICompiler, points_in_rois
+from sliced_inference import get_roi_slices, get_slices
+from supervisor import Supervisor
+from timing import NULL_TIMER
+from transport import FrameSender, encode_frame
 
 # --- Configuration ---
 SERVER_URL = "http://localhost:5001/api/intersections"
@@ -19,6 +29,29 @@ INTERSECTION_ID = "68bf113329a3d66abae0fd7c"
 # ALLOWED_CLASSES = ['car', 'motorcycle', 'bus', 'truck', 'bicycle']
 ALLOWED_CLASSES = ['lmv', 'motorbike', 'bus', 'truck', 'autorickshaw', 'lcv', 'tractor']
 PROCESSING_INTERVAL = 5
+# One process owns the model and batches frames from every camera (or pass --inference-server)
+USE_INFERENCE_SERVER = False
+# Only run the SAHI slices that overlap an ROI; detections elsewhere are never counted
+ROI_AWARE_SLICING = True
+# 'binary' sends the JPEG as raw bytes next to a small JSON header; 'json' is the old base64 payload
+FRAME_TRANSPORT = 'binary'
+# Lets SIGUSR1 (or GET /profile?camera=North on the metrics endpoint) dump a flame-graph profile (or pass --profiler)
+ENABLE_PROFILER = False
+# Skip inference when no ROI changed since the last one and reuse its detections (see motion.py;
+# or pass --no-motion-gating)
+MOTION_GATING = True
+# Between full ticks, a cheap whole-frame estimate updates densities every INTERMEDIATE_INTERVAL
+# seconds; both tiers are smoothed per ROI (see density.py; or pass --single-tier)
+TWO_TIER_ANALYSIS = True
+INTERMEDIATE_INTERVAL = 1.0
+# Hot reload: the manager polls the config (a 304 when nothing changed) and updates workers in place
+CONFIG_POLL_INTERVAL = 10
+# Camera fields a running worker can take without a restart; any other change restarts it
+RELOADABLE_FIELDS = {'rois', 'roiPolygons', '__v'}
+MAX_CAMERAS = 16          # Inference server result queues; cameras added later take a free one
+WORKER_STOP_TIMEOUT = 10  # Seconds a worker gets to exit before it is terminated
+SUPERVISE_INTERVAL = 1    # Seconds between checks for crashed workers
+INFERENCE_SERVER_NAME = 'inference-server'
 
 POLLUTION_WEIGHTS = {
     'truck': 10,
@@ -30,42 +63,277 @@ POLLUTION_WEIGHTS = {
     'motorbike': 1,
 }
 
-SLICE_HEIGHT = 640
-SLICE_WIDTH = 640
-
 # --- Functions ---
-def fetch_intersection_data():
-    """Fetches the main intersection object which contains the list of cameras."""
+def fetch_intersection_data(etag=None):
+    """
+    Fetches the main intersection object which contains the list of cameras.
+    Returns (data, etag). With the etag of an earlier fetch the server answers 304 when nothing
+    changed, and data is None (as it is on errors).
+    """
     try:
-        print("[Manager] Fetching intersection and camera configurations...")
+        if etag is None:
+            print("[Manager] Fetching intersection and camera configurations...")
         # This endpoint must populate the camera data
         url = f"{SERVER_URL}/{INTERSECTION_ID}"
-        response = requests.get(url)
+        headers = {'If-None-Match': etag} if etag else {}
+        response = requests.get(url, headers=headers, timeout=10)
         
+        if response.status_code == 304:
+            return None, etag
         if response.status_code == 200:
-            print("[Manager] Successfully fetched configuration.")
-            return response.json()
+            if etag is None:
+                print("[Manager] Successfully fetched configuration.")
+            return response.json(), response.headers.get('ETag')
         else:
             print(f"[Manager] Error fetching config. Status: {response.status_code}")
-            return None
+            return None, etag
     except requests.exceptions.RequestException as e:
         print(f"[Manager] Error connecting to server: {e}")
-        return None
+        return None, etag
+
+class CameraAnalyzer:
+    """Everything one analysis tick needs for a camera: its model handle, class table and compiled ROIs."""
+
+    def __init__(self, camera_name, rois, detection_model, motion_gating=MOTION_GATING, two_tier=TWO_TIER_ANALYSIS):
+        self.camera_name = camera_name
+        self.detection_model = detection_model
+        self.class_table = ClassTable(detection_model.category_mapping, ALLOWED_CLASSES, POLLUTION_WEIGHTS)
+
+        # Polygons, areas and masks are built once here, not on every tick
+        self.roi_compiler = ROICompiler()
+        self.compiled_rois = self.roi_compiler.compile(rois)
+        self.roi_slices = None # Worked out from the first frame's shape
+        self.last_detection_count = 0
+        self.motion_gate = MotionGate() if motion_gating else None
+        self.two_tier = two_tier
+        self.last_detections = None
+        self.last_tick_reused = False # Whether the latest tick reused the previous detections
+        self.last_coarse_detections = None # The latest full tick's full-frame-only detections
+        self.density_tracker = DensityTracker()
+
+    def update_rois(self, rois):
+        """Takes a new 'rois' config in place: only changed ROIs are recompiled, and the slices are re-planned."""
+        self.compiled_rois = self.roi_compiler.compile(rois)
+        self.roi_slices = None
+        if self.motion_gate:
+            self.motion_gate.reset()
+        self.density_tracker.reset()
+
+    def detect(self, frame, timer=NULL_TIMER):
+        """The frame's detections: from the model, or the last ones if the motion gate says nothing changed."""
+        if self.motion_gate:
+            # No reference frame yet (first tick, or ROIs just changed) always means inference
+            with timer.stage('motion'):
+                needs_inference = self.motion_gate.needs_inference(frame, self.compiled_rois)
+            if not needs_inference:
+                self.last_tick_reused = True
+                return self.last_detections
+
+        self.last_tick_reused = False
+        self.last_coarse_detections = None
+        if self.two_tier:
+            # The SAHI run's own full-frame prediction doubles as the coarse estimate for calibration
+            detections, self.last_coarse_detections = self.detection_model.predict(frame, self.roi_slices, timer, with_coarse=True)
+        else:
+            detections = self.detection_model.predict(frame, self.roi_slices, timer)
+        if detections is not None:
+            self.last_detections = detections
+            if self.motion_gate:
+                self.motion_gate.accept()
+        return detections
+
+    def analyze(self, frame, timer=NULL_TIMER):
+        """
+        Runs one analysis tick on a frame. Returns (payload, jpeg_bytes),
+        or None if inference failed.
+        """
+        with timer.stage('slicing'):
+            if ROI_AWARE_SLICING and self.roi_slices is None:
+                self.roi_slices = get_roi_slices(frame.shape, self.compiled_rois)
+                print(f"[{self.camera_name}] ROI-aware slicing: running {len(self.roi_slices)} slices per frame.")
+
+        # Detections come back as arrays; everything below is array operations
+        detections = self.detect(frame, timer)
+        if detections is None:
+            return None
+        self.last_detection_count = len(detections)
+
+        frame_densities, frame_pollution, people_counts = self.measure(detections, timer)
+        pedestrian_waiting = any(count > 0 for count in people_counts.values())
+
+        densities = frame_densities
+        if self.two_tier:
+            coarse = None
+            if not self.last_tick_reused and self.last_coarse_detections is not None:
+                # The same frame's coarse densities calibrate the intermediate ticks
+                with timer.stage('coarse_calibration'):
+                    coarse = self.measure(self.last_coarse_detections)[0]
+            densities = self.density_tracker.update_full(frame_densities, time.time(), coarse)
+
+        with timer.stage('annotation'):
+            annotated_frame_for_payload = self.annotate(frame, frame_densities, people_counts)
+
+        with timer.stage('jpeg_encode'):
+            jpeg_bytes = encode_frame(annotated_frame_for_payload)
+
+        # --- 6. UPDATE THE PAYLOAD ---
+        first_traffic_density = list(densities.values())[0] if densities else 0
+        total_pollution = sum(frame_pollution.values())
+
+        payload = {
+            "cameraName": self.camera_name,
+            "densities": { "default": first_traffic_density }, 
+            "pollutionScore": total_pollution,
+            "pedestrianWaiting": pedestrian_waiting
+        }
+        return payload, jpeg_bytes
+
+    def estimate(self, frame, timer=NULL_TIMER):
+        """
+        An intermediate tick between full analyses: densities from one whole-frame prediction
+        (or the last full tick's, if the motion gate sees no change), corrected and smoothed by
+        the DensityTracker. Returns a densities-only payload (no frame), or None on failure.
+        """
+        unchanged = False
+        if self.motion_gate:
+            with timer.stage('motion'):
+                unchanged = not self.motion_gate.needs_inference(frame, self.compiled_rois)
+
+        if unchanged:
+            densities = self.density_tracker.update_unchanged(time.time())
+        else:
+            with timer.stage('coarse_inference'):
+                detections = self.detection_model.predict(frame, self.coarse_slices(frame.shape))
+            if detections is None:
+                return None
+            densities = self.density_tracker.update_coarse(self.measure(detections, timer)[0], time.time())
+
+        return {
+            "cameraName": self.camera_name,
+            "densities": { "default": list(densities.values())[0] if densities else 0 },
+        }
+
+    @staticmethod
+    def coarse_slices(frame_shape):
+        """
+        Slices for a coarse prediction: none, which leaves only SAHI's whole-frame prediction
+        (or the one slice, for frames no bigger than a slice).
+        """
+        return [] if len(get_slices(frame_shape)) > 1 else None
+
+    def measure(self, detections, timer=NULL_TIMER):
+        """Returns ({ roi: density % }, { roi: pollution }, { roi: people waiting }) for a frame's detections."""
+        frame_densities = {}
+        frame_pollution = {}
+        # We don't need this variable: total_pollution_score_for_camera = 0
+
+        class_table = self.class_table
+        with timer.stage('roi_assignment'):
+            vehicles = detections.filter(class_table.allowed[detections.class_ids])
+            people = detections.filter(detections.class_ids == class_table.person_id)
+
+            # Vehicles are assigned by bbox center, people by the (center x, top y) anchor
+            vehicle_centers = vehicles.centers()
+            person_anchors = people.top_anchors()
+
+            # One pass for every point against every ROI: (detections x ROIs)
+            membership = points_in_rois(np.concatenate([vehicle_centers, person_anchors]), self.roi_compiler.edge_table)
+            vehicle_membership = membership[:len(vehicle_centers)]
+            person_membership = membership[len(vehicle_centers):]
+
+        # --- 5. THE MAIN LOGIC CHANGE ---
+        # Loop over the compiled 'rois'
+        people_counts = {}
+        with timer.stage('occupancy'):
+            vehicle_boxes = vehicles.int_boxes()
+            roi_pollution = class_table.pollution_weights[vehicles.class_ids] @ vehicle_membership
+
+            for roi_index, roi in enumerate(self.compiled_rois):
+                # --- A: If it's a 'Traffic' ROI, do density/pollution ---
+                if roi.type == 'Traffic':
+                    if roi.area == 0: continue # Avoid division by zero
+
+                    frame_pollution[roi.name] = int(roi_pollution[roi_index])
+                    frame_densities[roi.name] = roi.occupancy(vehicle_boxes[vehicle_membership[:, roi_index]])
+
+                # --- B: If it's a 'Pedestrian' ROI, check for people ---
+                elif roi.type == 'Pedestrian':
+                    people_counts[roi.name] = int(np.count_nonzero(person_membership[:, roi_index]))
+
+        return frame_densities, frame_pollution, people_counts
+
+    def annotate(self, frame, frame_densities, people_counts):
+        """Draws every ROI with its density or waiting count on a copy of the frame."""
+        annotated_frame = frame.copy()
+        for roi in self.compiled_rois:
+            if roi.name in frame_densities and roi.type == 'Traffic':
+                cv2.polylines(annotated_frame, [roi.polygon], True, (255, 0, 0), 3) # Blue
+                text = f"{roi.name}: {frame_densities[roi.name]:.1f}%"
+            elif roi.name in people_counts and roi.type == 'Pedestrian':
+                num_people = people_counts[roi.name]
+                color = (0, 0, 255) if num_people > 0 else (0, 255, 0) # Red/Green
+                cv2.polylines(annotated_frame, [roi.polygon], True, color, 3)
+                text = f"{roi.name}: {num_people} waiting"
+            else:
+                continue
+            cv2.putText(annotated_frame, text, roi.label_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
+            cv2.putText(annotated_frame, text, roi.label_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        return annotated_frame
+
+
+def submit_payload(sender, payload, jpeg_bytes):
+    """Hands a tick's result to the sender in the configured FRAME_TRANSPORT format."""
+    if FRAME_TRANSPORT == 'binary':
+        sender.submit(payload, jpeg_bytes)
+    else:
+        payload["annotatedFrame"] = base64.b64encode(jpeg_bytes).decode('utf-8')
+        sender.submit(payload)
+
+
+def record_io_metrics(metrics, grabber, sender):
+    """Copies the capture thread's and sender thread's own counters into the worker metrics."""
+    metrics.counters['frames_grabbed'] = grabber.frames_grabbed
+    metrics.counters['frames_decoded'] = grabber.frames_decoded
+    metrics.counters['sends'] = sender.sent
+    metrics.counters['send_failures'] = sender.failed
+    metrics.counters['sends_dropped'] = sender.dropped
+    metrics.set_gauge('send_queue_depth', sender.queue_depth())
+    metrics.set_gauge('send_latency_seconds', sender.last_latency)
+
 
-def send_data_to_server(payload):
-    """Sends the analysis payload to the Node.js server."""
+def record_slice_cache_metrics(metrics, detection_model):
+    """Copies the slice cache's hit/miss counters into the worker metrics, for tuning the cache."""
+    stats = dict(detection_model.slice_cache_stats())
+    if not stats:
+        return
+    metrics.set_gauge('slice_cache_hit_rate', stats.pop('hit_rate'))
+    for name, value in stats.items():
+        metrics.counters[f'slice_cache_{name}'] = value
+
+
+def wait_for_control(control_queue, timeout):
+    """Sleeps up to 'timeout' seconds, returning early with a control message if one arrives."""
+    if control_queue is None:
+        time.sleep(timeout)
+        return None
     try:
-        headers = {'Content-Type': 'application/json'}
-        url = f"{SERVER_URL}/{INTERSECTION_ID}/data"
-        response = requests.post(url, data=json.dumps(payload), headers=headers)
-        if response.status_code != 200:
-            print(f"Failed to send data. Server responded with {response.status_code}")
-    except requests.exceptions.RequestException:
-        pass
+        return control_queue.get(timeout=timeout) if timeout > 0 else control_queue.get_nowait()
+    except queue.Empty:
+        return None
 
 
-def process_camera_feed(camera_config):
-    """This is the main worker function for a single camera."""
+def process_camera_feed(camera_config, inference=None, metrics_queue=None, control_queue=None, options=None):
+    """
+    This is the main worker function for a single camera.
+    'inference' is (request_queue, result_queue, category_mapping, route_key) when using the shared inference server.
+    'metrics_queue' receives periodic WorkerMetrics snapshots for the manager's /metrics endpoint.
+    'control_queue' gets ('config', camera_config) for a hot reload and ('stop', None) from the manager.
+    'options' overrides the feature toggles: { profiler, motion_gating, two_tier }.
+    """
+    options = options or {}
+    profiler = options.get('profiler', ENABLE_PROFILER)
+    motion_gating = options.get('motion_gating', MOTION_GATING)
+    two_tier = options.get('two_tier', TWO_TIER_ANALYSIS)
 
     rois = camera_config.get('rois', [])
     camera_name = camera_config.get('name', 'Unknown')
@@ -77,155 +345,264 @@ def process_camera_feed(camera_config):
         print(f"[{camera_name}] Error: Missing videoSource or valid rois in config.")
         return
 
-    device = "mps" if torch.backends.mps.is_available() else "cpu"
-    print(f"[{camera_name}] Worker started. Device: {device}, Source: {video_source}")
+    if inference:
+        request_queue, result_queue, category_mapping, route_key = inference
+        detection_model = RemoteDetectionModel(camera_name, request_queue, result_queue, category_mapping, route_key)
+    else:
+        detection_model = LocalDetectionModel()
+    print(f"[{camera_name}] Worker started. Device: {detection_model.device}, Source: {video_source}")
 
-    detection_model = AutoDetectionModel.from_pretrained(
-        model_type='yolov8', model_path='models/bestn.pt',
-        confidence_threshold=0.3, device=device
-    )
+    analyzer = CameraAnalyzer(camera_name, rois, detection_model, motion_gating, two_tier)
 
-    cap = cv2.VideoCapture("videos/"+video_source)
-    if not cap.isOpened():
+    grabber = FrameGrabber("videos/"+video_source, camera_name)
+    if not grabber.is_opened():
         print(f"[{camera_name}] Error: Could not open video source.")
-        return
+        sys.exit(1) # Worth retrying (e.g. a stream that is down); the supervisor restarts us
+    grabber.start()
+
+    # Payloads go out on a background thread; a slow server never stalls this loop
+    sender = FrameSender(f"{SERVER_URL}/{INTERSECTION_ID}/data", camera_name).start()
+    # The metrics object is also the tick's stage timer
+    metrics = WorkerMetrics(camera_name)
+    pusher = MetricsPusher(metrics, metrics_queue)
+    if profiler and install_profiler_hook(camera_name):
+        # The manager only signals workers that report the hook; without it SIGUSR1 would kill us
+        metrics.set_gauge('profiler_hook_installed', 1)
+        print(f"[{camera_name}] Profiler hook installed (SIGUSR1).")
 
     last_analysis_time = 0
+    last_estimate_time = 0
+    last_dropped = 0
     
     while True:
-        ret, frame = cap.read()
-        if not ret:
-            print(f"[{camera_name}] End of video stream. Restarting...")
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # Loop the video
+        # Sleep until the next analysis (or intermediate estimate) is due; the grabber keeps the stream moving meanwhile
+        next_due = last_analysis_time + PROCESSING_INTERVAL
+        if two_tier and last_analysis_time:
+            next_due = min(next_due, last_estimate_time + INTERMEDIATE_INTERVAL)
+        message = wait_for_control(control_queue, max(0, next_due - time.time()))
+        if message:
+            command, new_config = message
+            if command == 'stop':
+                break
+            if command == 'config':
+                analyzer.update_rois(new_config.get('rois', []))
+                metrics.inc('config_reloads')
+                print(f"[{camera_name}] ROI configuration reloaded ({len(analyzer.compiled_rois)} ROIs).")
             continue
-        
         current_time = time.time()
         
         if (current_time - last_analysis_time) >= PROCESSING_INTERVAL:
-            last_analysis_time = current_time
-            print(f"[{camera_name}] Running analysis at {time.strftime('%H:%M:%S')}")
-            
-            height, width, _ = frame.shape
-            frame_densities = {}
-            frame_pollution = {}
-            pedestrian_waiting = False
-            # We don't need this variable: total_pollution_score_for_camera = 0
-
-            result = get_sliced_prediction(
-                frame, detection_model,
-                slice_height=SLICE_HEIGHT, slice_width=SLICE_WIDTH,
-                overlap_height_ratio=0.2, overlap_width_ratio=0.2
-            )
-            filtered_predictions = [p for p in result.object_prediction_list if p.category.name in ALLOWED_CLASSES]
-
-            person_predictions = [
-                p for p in result.object_prediction_list 
-                if p.category.name == 'person'
-            ]
-
-            annotated_frame_for_payload = frame.copy()
-
-            # --- 5. THE MAIN LOGIC CHANGE (NOW INDENTED) ---
-            # Loop over the new 'rois' array
-            for roi in rois:
-                roi_name = roi.get('name')
-                roi_type = roi.get('type')
-                roi_points = roi.get('points')
-
-                if not roi_name or not roi_type or not roi_points:
-                    continue 
-
-                current_roi_polygon = np.array(roi_points, np.int32)
-
-                # --- A: If it's a 'Traffic' ROI, do density/pollution ---
-                if roi_type == 'Traffic':
-                    roi_area = cv2.contourArea(current_roi_polygon)
-                    if roi_area == 0: continue # Avoid division by zero
-
-                    predictions_in_roi = [
-                        p for p in filtered_predictions
-                        if cv2.pointPolygonTest(current_roi_polygon, (int((p.bbox.minx + p.bbox.maxx) / 2), int((p.bbox.miny + p.bbox.maxy) / 2)), False) >= 0
-                    ]
-
-                    current_lane_pollution = sum(POLLUTION_WEIGHTS.get(p.category.name, 0) for p in predictions_in_roi)
-                    frame_pollution[roi_name] = current_lane_pollution
+            with metrics.stage('decode'):
+                frame = grabber.read()
+            if frame is None:
+                print(f"[{camera_name}] No frame from video source, retrying...")
+                continue
 
-                    bboxes_in_roi = [[int(p.bbox.minx), int(p.bbox.miny), int(p.bbox.maxx), int(p.bbox.maxy)] for p in predictions_in_roi]
+            last_analysis_time = last_estimate_time = current_time
+            print(f"[{camera_name}] Running analysis at {time.strftime('%H:%M:%S')}")
 
-                    bbox_mask = np.zeros((height, width), dtype=np.uint8)
-                    for bbox in bboxes_in_roi:
-                        cv2.rectangle(bbox_mask, (bbox[0], bbox[1]), (bbox[2], bbox[3]), 255, -1)
+            result = analyzer.analyze(frame, metrics)
+            if result is None:
+                print(f"[{camera_name}] Inference failed, skipping this tick.")
+                metrics.inc('inference_failures')
+                continue
+
+            payload, jpeg_bytes = result
+            with metrics.stage('send'):
+                submit_payload(sender, payload, jpeg_bytes)
+
+            if sender.dropped > last_dropped: # Only when it got worse, not on every tick after
+                last_dropped = sender.dropped
+                print(f"[{camera_name}] Sender backpressure: {sender.stats()}")
+
+            metrics.inc('frames_analyzed')
+            if analyzer.last_tick_reused:
+                metrics.inc('inference_skipped')
+            if analyzer.motion_gate:
+                metrics.set_gauge('motion_change_max', max(analyzer.motion_gate.last_scores.values(), default=0.0))
+            metrics.detections_per_tick.observe(analyzer.last_detection_count)
+            record_io_metrics(metrics, grabber, sender)
+            record_slice_cache_metrics(metrics, detection_model)
+            pusher.maybe_push()
+
+        elif two_tier and last_analysis_time and (current_time - last_estimate_time) >= INTERMEDIATE_INTERVAL:
+            # Cheap tier: densities only, no frame, so the signal logic sees fresh values between full ticks
+            last_estimate_time = current_time
+            with metrics.stage('decode'):
+                frame = grabber.read()
+            if frame is None:
+                continue
+            with metrics.stage('estimate'):
+                payload = analyzer.estimate(frame, metrics)
+            if payload is None:
+                metrics.inc('estimate_failures')
+                continue
+            with metrics.stage('send'):
+                sender.submit(payload, droppable=True)
+            metrics.inc('intermediate_ticks')
+            pusher.maybe_push()
+
+    grabber.stop()
+    print(f"[{camera_name}] Worker stopped.")
 
-                    roi_mask = np.zeros((height, width), dtype=np.uint8)
-                    cv2.fillPoly(roi_mask, [current_roi_polygon], 255)
+# ... (rest of the file is correct) ...
 
-                    occupied_area_mask = cv2.bitwise_and(bbox_mask, roi_mask)
-                    density = (cv2.countNonZero(occupied_area_mask) / roi_area) * 100
-                    frame_densities[roi_name] = density
 
-                    # Draw on frame
-                    cv2.polylines(annotated_frame_for_payload, [current_roi_polygon], True, (255, 0, 0), 3) # Blue
-                    density_text = f"{roi_name}: {density:.1f}%"
-                    text_pos = (roi_points[0][0], roi_points[0][1] - 10)
-                    cv2.putText(annotated_frame_for_payload, density_text, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
-                    cv2.putText(annotated_frame_for_payload, density_text, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-                # --- B: If it's a 'Pedestrian' ROI, check for people ---
-                elif roi_type == 'Pedestrian':
-                    people_in_roi = [
-                        p for p in person_predictions
-                        if cv2.pointPolygonTest(current_roi_polygon, (int((p.bbox.minx + p.bbox.maxx) / 2), int(p.bbox.miny)), False) >= 0
-                    ]
-
-                    num_people = len(people_in_roi)
-                    if num_people > 0:
-                        pedestrian_waiting = True
-
-                    color = (0, 0, 255) if num_people > 0 else (0, 255, 0) # Red/Green
-                    cv2.polylines(annotated_frame_for_payload, [current_roi_polygon], True, color, 3)
-                    text = f"{roi_name}: {num_people} waiting"
-                    text_pos = (roi_points[0][0], roi_points[0][1] - 10)
-                    cv2.putText(annotated_frame_for_payload, text, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
-                    cv2.putText(annotated_frame_for_payload, text, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-            # --- 6. UPDATE THE PAYLOAD (STILL INDENTED) ---
-            first_traffic_density = list(frame_densities.values())[0] if frame_densities else 0
-            total_pollution = sum(frame_pollution.values())
-
-            _, buffer = cv2.imencode('.jpg', annotated_frame_for_payload)
-            frame_as_base64 = base64.b64encode(buffer).decode('utf-8')
-
-            payload = {
-                "cameraName": camera_name,
-                "densities": { "default": first_traffic_density }, 
-                "annotatedFrame": frame_as_base64,
-                "pollutionScore": total_pollution,
-                "pedestrianWaiting": pedestrian_waiting
-            }
-            send_data_to_server(payload)
-
-# ... (rest of the file is correct) ...
+def only_reloadable_changes(old_config, new_config):
+    """True if two camera configs differ only in RELOADABLE_FIELDS."""
+    fields = (set(old_config) | set(new_config)) - RELOADABLE_FIELDS
+    return all(old_config.get(field) == new_config.get(field) for field in fields)
+
+
+class CameraWorkers:
+    """
+    The manager's camera worker processes, keyed by camera name. apply() takes a new camera list:
+    ROI edits are pushed to the running worker over its control queue, other edits restart it,
+    and added or removed cameras get their worker started or stopped. The processes themselves
+    are run by the Supervisor, which restarts crashed ones and pins them to CPUs.
+    """
+
+    def __init__(self, supervisor, metrics_queue, aggregator, inference=None, options=None):
+        self.supervisor = supervisor
+        self.metrics_queue = metrics_queue
+        self.aggregator = aggregator
+        self.inference = inference # (request_queue, result_queues by slot, category_mapping)
+        self.options = options     # Passed to every worker (see process_camera_feed)
+        self.configs = {}
+        self.control_queues = {}
+        self.slots = {}
+
+    def apply(self, cameras):
+        new_configs = {c.get('name', 'Unknown'): c for c in cameras}
+        for camera_name in list(self.configs):
+            if camera_name not in new_configs:
+                print(f"[Manager] Camera removed: {camera_name}")
+                self.stop(camera_name)
+
+        for camera_name, camera_config in new_configs.items():
+            old_config = self.configs.get(camera_name)
+            if old_config is None:
+                self.start(camera_config)
+            elif camera_config == old_config:
+                continue
+            elif only_reloadable_changes(old_config, camera_config):
+                self.configs[camera_name] = camera_config
+                if self.supervisor.is_finished(camera_name):
+                    # It exited cleanly (e.g. it had no ROIs) and reads no queue: start it again, with
+                    # a fresh queue so it can't pick up a config its previous run never got to
+                    self.control_queues[camera_name] = Queue()
+                    self.supervisor.restart_finished(camera_name, self._worker_args(camera_name))
+                    continue
+                print(f"[Manager] Reloading ROIs for camera: {camera_name}")
+                self.control_queues[camera_name].put(('config', camera_config))
+                # A worker restarted after a crash starts from the current config
+                self.supervisor.set_args(camera_name, self._worker_args(camera_name))
+            else:
+                print(f"[Manager] Camera {camera_name} changed; restarting its worker.")
+                self.stop(camera_name)
+                self.start(camera_config)
+
+    def _worker_args(self, camera_name):
+        inference_args = None
+        if self.inference:
+            request_queue, result_queues, category_mapping = self.inference
+            slot = self.slots[camera_name]
+            inference_args = (request_queue, result_queues[slot], category_mapping, slot)
+        return (self.configs[camera_name], inference_args, self.metrics_queue, self.control_queues[camera_name], self.options)
+
+    def start(self, camera_config):
+        camera_name = camera_config.get('name', 'Unknown')
+        if self.inference:
+            result_queues = self.inference[1]
+            slot = next((s for s in result_queues if s not in self.slots.values()), None)
+            if slot is None:
+                print(f"[Manager] No free inference slot for camera {camera_name} (MAX_CAMERAS={len(result_queues)}).")
+                return
+            self.slots[camera_name] = slot
+
+        print(f"[Manager] Creating process for camera: {camera_name}")
+        self.configs[camera_name] = camera_config
+        self.control_queues[camera_name] = Queue()
+        # Create a new process for each camera, targeting our worker function
+        self.supervisor.start(camera_name, process_camera_feed, self._worker_args(camera_name))
+
+    def stop(self, camera_name):
+        control_queue = self.control_queues.pop(camera_name, None)
+        self.configs.pop(camera_name, None)
+        self.slots.pop(camera_name, None)
+        if control_queue is not None:
+            control_queue.put(('stop', None))
+            self.supervisor.stop(camera_name, WORKER_STOP_TIMEOUT)
+        self.aggregator.forget(camera_name)
+
+    def stop_all(self):
+        for camera_name in list(self.configs):
+            self.stop(camera_name)
 
 
 # --- MANAGER: This is the main entry point ---
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs one analysis worker per camera of the intersection.")
+    parser.add_argument('--inference-server', action='store_true', default=USE_INFERENCE_SERVER,
+                        help="Share one batched model between all cameras")
+    parser.add_argument('--profiler', action='store_true', default=ENABLE_PROFILER,
+                        help="Let workers be profiled on demand (SIGUSR1 or /profile)")
+    parser.add_argument('--no-motion-gating', dest='motion_gating', action='store_false', default=MOTION_GATING,
+                        help="Run inference every tick, even on static scenes")
+    parser.add_argument('--single-tier', dest='two_tier', action='store_false', default=TWO_TIER_ANALYSIS,
+                        help="No intermediate density estimates between full ticks")
+    args = parser.parse_args()
+    options = {"profiler": args.profiler, "motion_gating": args.motion_gating, "two_tier": args.two_tier}
+
     print("[Manager] Starting up...")
-    intersection_data = fetch_intersection_data()
+    intersection_data, config_etag = fetch_intersection_data()
 
     if intersection_data and 'cameras' in intersection_data and intersection_data['cameras']:
-        processes = []
-        
-        for camera_config in intersection_data['cameras']:
-            print(f"[Manager] Creating process for camera: {camera_config.get('name', 'Unknown')}")
-            
-            # Create a new process for each camera, targeting our worker function
-            p = Process(target=process_camera_feed, args=(camera_config,))
-            processes.append(p)
-            p.start()
-
-        print(f"[Manager] Launched {len(processes)} worker processes.")
-        
-        for p in processes:
-            p.join() # Wait for all processes to finish
+        cameras = intersection_data['cameras']
+
+        # Workers push metric snapshots here; the manager serves them on a local HTTP endpoint
+        metrics_queue = Queue(maxsize=100)
+        worker_pids = {}
+        aggregator = MetricsAggregator(metrics_queue, worker_pids)
+        # Restarts crashed workers, pins each to its own CPUs and splits the thread budget between them
+        supervisor = Supervisor(worker_pids, heartbeat=aggregator.last_report_time)
+        aggregator.health = supervisor.health
+        aggregator.start()
+
+        inference = None
+        if args.inference_server:
+            # One model for everyone: workers send frames, the server batches them.
+            # Result queues are slots, so cameras added while running can get one too
+            request_queue = Queue()
+            result_queues = {slot: Queue() for slot in range(max(MAX_CAMERAS, len(cameras)))}
+            ready_queue = Queue()
+            # The server does the heavy lifting, so it gets as many CPUs as all the cameras together
+            supervisor.start(INFERENCE_SERVER_NAME, run_inference_server, (request_queue, result_queues, ready_queue),
+                             weight=len(cameras), reports_metrics=False)
+            category_mapping = ready_queue.get()
+            print("[Manager] Inference server is ready.")
+            inference = (request_queue, result_queues, category_mapping)
+
+        workers = CameraWorkers(supervisor, metrics_queue, aggregator, inference, options)
+        workers.apply(cameras)
+        print(f"[Manager] Launched {len(workers.configs)} worker processes.")
+
+        # Hot reload: unchanged configs cost one 304; changes go only to the workers they affect
+        next_config_poll = time.monotonic() + CONFIG_POLL_INTERVAL
+        try:
+            while True:
+                time.sleep(SUPERVISE_INTERVAL)
+                supervisor.check()
+                if time.monotonic() < next_config_poll:
+                    continue
+                next_config_poll = time.monotonic() + CONFIG_POLL_INTERVAL
+                intersection_data, config_etag = fetch_intersection_data(config_etag)
+                if intersection_data is not None:
+                    print("[Manager] Configuration changed on the server.")
+                    workers.apply(intersection_data.get('cameras', []))
+        except KeyboardInterrupt:
+            print("[Manager] Stopping workers...")
+            workers.stop_all()
+            supervisor.stop_all(WORKER_STOP_TIMEOUT)
     else:
         print("[Manager] Could not fetch valid camera data to start workers. Please check your database and INTERSECTION_ID.")
\ No newline at end of file
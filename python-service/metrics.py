@@ -0,0 +1,358 @@
+# python-service/metrics.py
+
+import bisect
+import collections
+import contextlib
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import psutil
+except ImportError: # Optional; /proc or resource is used instead
+    psutil = None
+
+# --- Configuration ---
+METRICS_HOST = "127.0.0.1"
+# 9100 is node_exporter's port; override with the TRAFFIC_METRICS_PORT environment variable
+METRICS_PORT = int(os.environ.get('TRAFFIC_METRICS_PORT', 9477))
+METRICS_PUSH_INTERVAL = 5       # Seconds between worker snapshots sent to the manager
+PROFILE_SECONDS = 30            # Length of an on-demand profile
+PROFILE_SAMPLE_INTERVAL = 0.01  # 100 Hz
+PROFILE_DIR = "profiles"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """A fixed-bucket histogram (Prometheus style: upper bounds, plus +Inf)."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {"buckets": self.buckets, "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+def read_rss_bytes():
+    """Resident set size of this process."""
+    if psutil:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource # Peak RSS only; kilobytes on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class WorkerMetrics:
+    """
+    Per-camera worker instrumentation. It doubles as the tick's StageTimer, so every stage
+    the analyzer times lands in a latency histogram.
+    """
+
+    def __init__(self, camera_name):
+        self.camera_name = camera_name
+        self.stage_seconds = collections.defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.detections_per_tick = Histogram(COUNT_BUCKETS)
+        self.counters = collections.Counter()
+        self.gauges = {}
+        self._last_cpu = (time.monotonic(), self._cpu_seconds())
+
+    # --- StageTimer interface ---
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.stage_seconds[name].observe(seconds)
+
+    # --- Everything else ---
+    def inc(self, name, amount=1):
+        self.counters[name] += amount
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    @staticmethod
+    def _cpu_seconds():
+        times = os.times()
+        return times.user + times.system
+
+    def sample_process(self):
+        """Updates the RSS and CPU gauges for this worker process."""
+        now, cpu = time.monotonic(), self._cpu_seconds()
+        last_time, last_cpu = self._last_cpu
+        if now > last_time:
+            self.gauges['cpu_percent'] = 100 * (cpu - last_cpu) / (now - last_time)
+        self._last_cpu = (now, cpu)
+        self.gauges['cpu_seconds_total'] = cpu
+        self.gauges['rss_bytes'] = read_rss_bytes()
+
+    def snapshot(self):
+        self.sample_process()
+        return {
+            "camera": self.camera_name,
+            "pid": os.getpid(),
+            "time": time.time(),
+            "stages": {name: h.snapshot() for name, h in self.stage_seconds.items()},
+            "detections_per_tick": self.detections_per_tick.snapshot(),
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+        }
+
+
+class MetricsPusher:
+    """Sends a worker's snapshot to the manager at most every METRICS_PUSH_INTERVAL seconds."""
+
+    def __init__(self, metrics, metrics_queue, interval=METRICS_PUSH_INTERVAL):
+        self.metrics = metrics
+        self.metrics_queue = metrics_queue
+        self.interval = interval
+        self._last_push = 0
+
+    def maybe_push(self):
+        if self.metrics_queue is None or time.monotonic() - self._last_push < self.interval:
+            return
+        self._last_push = time.monotonic()
+        try:
+            self.metrics_queue.put_nowait(self.metrics.snapshot())
+        except queue.Full:
+            pass
+
+
+# --- Sampling profiler ---
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack at a fixed rate and writes the result in the collapsed
+    ("folded") format used by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, seconds=PROFILE_SECONDS, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.seconds = seconds
+        self.interval = interval
+        self.stacks = collections.Counter()
+
+    def run(self):
+        deadline = time.monotonic() + self.seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def dump(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def install_profiler_hook(camera_name):
+    """
+    Opt-in: after this, SIGUSR1 makes the worker profile its main thread for PROFILE_SECONDS
+    and write profiles/<camera>-<time>.folded. The manager's /profile endpoint sends the signal.
+    """
+    if not hasattr(signal, 'SIGUSR1'):
+        return False
+    main_thread_id = threading.main_thread().ident
+    running = threading.Event()
+
+    def profile():
+        profiler = SamplingProfiler(main_thread_id)
+        profiler.run()
+        path = os.path.join(PROFILE_DIR, f"{camera_name}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        profiler.dump(path)
+        print(f"[{camera_name}] Profile written to {path}")
+        running.clear()
+
+    def on_signal(signum, frame):
+        if not running.is_set():
+            running.set()
+            print(f"[{camera_name}] Profiling for {PROFILE_SECONDS}s...")
+            threading.Thread(target=profile, name=f"profiler-{camera_name}", daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, on_signal)
+    return True
+
+
+# --- Manager side ---
+
+class MetricsAggregator:
+    """Collects worker snapshots in the manager and serves them at /metrics in Prometheus text format."""
+
+    def __init__(self, metrics_queue, worker_pids, health=None):
+        self.metrics_queue = metrics_queue
+        self.worker_pids = worker_pids   # { camera_name: pid }, kept up to date by the manager
+        self.health = health             # Optional callable -> { worker: {...} } (Supervisor.health)
+        self.snapshots = {}
+        self._lock = threading.Lock()
+
+    def start(self, host=METRICS_HOST, port=METRICS_PORT):
+        threading.Thread(target=self._collect, name="metrics-collector", daemon=True).start()
+        try:
+            server = ThreadingHTTPServer((host, port), self._make_handler())
+        except OSError as e:
+            # Metrics are optional; a taken port must not stop the cameras
+            print(f"[Manager] ⚠️ Could not serve metrics on {host}:{port}: {e}. Set TRAFFIC_METRICS_PORT to another port.")
+            return self
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"[Manager] Metrics at http://{host}:{port}/metrics (worker health at /health)")
+        return self
+
+    def _collect(self):
+        while True:
+            snapshot = self.metrics_queue.get()
+            with self._lock:
+                self.snapshots[snapshot['camera']] = snapshot
+
+    def render(self):
+        """Prometheus text exposition of the latest snapshot from every worker."""
+        with self._lock:
+            snapshots = list(self.snapshots.values())
+
+        lines = []
+        lines += ["# HELP traffic_stage_seconds Analysis stage latency per camera.",
+                  "# TYPE traffic_stage_seconds histogram"]
+        for snap in snapshots:
+            for stage, hist in sorted(snap['stages'].items()):
+                lines += _histogram_lines('traffic_stage_seconds', f'camera="{snap["camera"]}",stage="{stage}"', hist)
+
+        lines += ["# HELP traffic_detections_per_tick Detections returned per analysis tick.",
+                  "# TYPE traffic_detections_per_tick histogram"]
+        for snap in snapshots:
+            lines += _histogram_lines('traffic_detections_per_tick', f'camera="{snap["camera"]}"', snap['detections_per_tick'])
+
+        counter_names = sorted({name for snap in snapshots for name in snap['counters']})
+        for name in counter_names:
+            lines += [f"# TYPE traffic_{name}_total counter"]
+            for snap in snapshots:
+                if name in snap['counters']:
+                    lines.append(f'traffic_{name}_total{{camera="{snap["camera"]}"}} {snap["counters"][name]}')
+
+        gauge_names = sorted({name for snap in snapshots for name in snap['gauges']})
+        for name in gauge_names:
+            lines += [f"# TYPE traffic_worker_{name} gauge"]
+            for snap in snapshots:
+                if name in snap['gauges']:
+                    lines.append(f'traffic_worker_{name}{{camera="{snap["camera"]}"}} {snap["gauges"][name]}')
+
+        lines += ["# TYPE traffic_worker_last_report_timestamp_seconds gauge"]
+        for snap in snapshots:
+            lines.append(f'traffic_worker_last_report_timestamp_seconds{{camera="{snap["camera"]}"}} {snap["time"]}')
+
+        if self.health:
+            health = self.health()
+            lines += ["# HELP traffic_worker_up 1 if the worker is running and reporting, else 0.",
+                      "# TYPE traffic_worker_up gauge"]
+            for name, h in sorted(health.items()):
+                lines.append(f'traffic_worker_up{{worker="{name}",status="{h["status"]}"}} {int(h["status"] == "healthy")}')
+            lines += ["# TYPE traffic_worker_restarts_total counter"]
+            for name, h in sorted(health.items()):
+                lines.append(f'traffic_worker_restarts_total{{worker="{name}"}} {h["restarts"]}')
+            lines += ["# TYPE traffic_worker_threads gauge"]
+            for name, h in sorted(health.items()):
+                lines.append(f'traffic_worker_threads{{worker="{name}"}} {h["threads"]}')
+        return '\n'.join(lines) + '\n'
+
+    def last_report_time(self, camera_name):
+        """Epoch time of the worker's latest snapshot (its heartbeat), or None."""
+        with self._lock:
+            snapshot = self.snapshots.get(camera_name)
+        return snapshot['time'] if snapshot else None
+
+    def forget(self, camera_name):
+        """Drops a stopped worker's last snapshot so it no longer shows up in /metrics."""
+        with self._lock:
+            self.snapshots.pop(camera_name, None)
+
+    def request_profile(self, camera_name):
+        """
+        Signals a worker to profile itself. Only workers whose latest snapshot (from their current
+        process) says the SIGUSR1 hook is installed qualify: SIGUSR1's default action kills the process.
+        """
+        pid = self.worker_pids.get(camera_name)
+        if not pid or not hasattr(signal, 'SIGUSR1'):
+            return False
+        with self._lock:
+            snapshot = self.snapshots.get(camera_name)
+        if not snapshot or snapshot['pid'] != pid or not snapshot['gauges'].get('profiler_hook_installed'):
+            return False
+        os.kill(pid, signal.SIGUSR1)
+        return True
+
+    def _make_handler(self):
+        aggregator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/metrics':
+                    self._reply(200, aggregator.render(), 'text/plain; version=0.0.4')
+                elif url.path == '/health':
+                    health = aggregator.health() if aggregator.health else {}
+                    healthy = all(h['status'] in ('healthy', 'starting', 'exited') for h in health.values())
+                    self._reply(200 if healthy else 503, json.dumps(health, indent=2) + '\n', 'application/json')
+                elif url.path == '/profile':
+                    camera = parse_qs(url.query).get('camera', [''])[0]
+                    if aggregator.request_profile(camera):
+                        self._reply(202, f"Profiling {camera}; see {PROFILE_DIR}/\n")
+                    else:
+                        self._reply(404, f"No profilable worker for camera '{camera}' (start the manager with --profiler)\n")
+                else:
+                    self._reply(404, "Not found\n")
+
+            def _reply(self, status, body, content_type='text/plain'):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass # Keep scrapes out of the console
+
+        return Handler
+
+
+def _histogram_lines(name, labels, hist):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(hist['buckets'], hist['counts']):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist["count"]}')
+    lines.append(f'{name}_sum{{{labels}}} {hist["sum"]}')
+    lines.append(f'{name}_count{{{labels}}} {hist["count"]}')
+    return lines
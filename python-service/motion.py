@@ -0,0 +1,103 @@
+# python-service/motion.py
+
+import time
+
+import cv2
+import numpy as np
+
+# --- Configuration ---
+MOTION_SCALE = 0.25          # Change detection runs on a frame downscaled by this factor
+MOTION_BLUR = 5              # Gaussian kernel size; smooths out sensor noise and compression artefacts
+PIXEL_THRESHOLD = 25         # Grey-level difference for a pixel to count as changed
+CHANGE_THRESHOLD = 0.02      # Fraction of an ROI's pixels that must change to re-run inference
+MAX_REUSE_SECONDS = 30       # Staleness bound: inference runs at least this often regardless
+
+
+class MotionGate:
+    """
+    Decides whether a tick needs inference. Each ROI of the new frame is compared with the frame
+    of the last inference, on a small blurred greyscale copy; if no ROI changed by more than
+    CHANGE_THRESHOLD, the last result still describes the scene (a red-phase queue, an empty road
+    at night). Comparing against the last inference rather than the previous tick means slow
+    changes add up until they trigger it.
+    """
+
+    def __init__(self, scale=MOTION_SCALE, pixel_threshold=PIXEL_THRESHOLD,
+                 change_threshold=CHANGE_THRESHOLD, max_reuse_seconds=MAX_REUSE_SECONDS):
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.change_threshold = change_threshold
+        self.max_reuse_seconds = max_reuse_seconds
+        self.last_scores = {}        # { roi_name: fraction of pixels changed } from the latest check
+        self.checks = 0
+        self.skipped = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets the reference frame (e.g. after an ROI change), so the next check asks for inference."""
+        self._reference = None
+        self._reference_time = 0.0
+        self._gray = None
+        self._masks = None
+        self._masks_key = None
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (max(1, int(w * self.scale)), max(1, int(h * self.scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (MOTION_BLUR, MOTION_BLUR), 0)
+
+    def _roi_masks(self, shape, compiled_rois):
+        """[(name, (x1, y1, x2, y2), cropped mask, pixel count)] at the small scale, built once per ROI set."""
+        key = (shape, tuple(id(roi) for roi in compiled_rois))
+        if key != self._masks_key:
+            masks = []
+            for roi in compiled_rois:
+                polygon = np.round(roi.polygon.reshape(-1, 2) * self.scale).astype(np.int32)
+                x, y, w, h = cv2.boundingRect(polygon)
+                mask = np.zeros((max(h, 1), max(w, 1)), dtype=np.uint8)
+                cv2.fillPoly(mask, [polygon - np.array([x, y], np.int32)], 255)
+                # Only the part of an ROI inside the frame can be compared: clip the rect and crop
+                # the mask by the same offsets (negative indices would wrap around otherwise)
+                x1, y1 = max(x, 0), max(y, 0)
+                x2, y2 = max(min(x + w, shape[1]), x1), max(min(y + h, shape[0]), y1)
+                mask = mask[y1 - y:y2 - y, x1 - x:x2 - x]
+                masks.append((roi.name, (x1, y1, x2, y2), mask, max(cv2.countNonZero(mask), 1)))
+            self._masks, self._masks_key = masks, key
+        return self._masks
+
+    def changed_fractions(self, frame, compiled_rois):
+        """
+        { roi_name: fraction of the ROI that differs from the reference frame }, or None with
+        no reference yet. Also keeps the frame's small copy for accept().
+        """
+        self._gray = self._small_gray(frame)
+        if self._reference is None or self._reference.shape != self._gray.shape:
+            return None
+        _, moving = cv2.threshold(cv2.absdiff(self._gray, self._reference), self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        fractions = {}
+        for name, (x1, y1, x2, y2), mask, pixels in self._roi_masks(self._gray.shape, compiled_rois):
+            if mask.size == 0:
+                fractions[name] = 0.0 # Entirely outside the frame
+                continue
+            fractions[name] = cv2.countNonZero(cv2.bitwise_and(moving[y1:y2, x1:x2], mask)) / pixels
+        return fractions
+
+    def needs_inference(self, frame, compiled_rois, now=None):
+        """True if the frame must go through the model; False if the last result can be reused."""
+        now = time.time() if now is None else now
+        self.checks += 1
+        fractions = self.changed_fractions(frame, compiled_rois)
+        self.last_scores = fractions or {}
+        if fractions is None or now - self._reference_time >= self.max_reuse_seconds:
+            return True
+        if max(fractions.values(), default=0.0) > self.change_threshold:
+            return True
+        self.skipped += 1
+        return False
+
+    def accept(self, now=None):
+        """Makes the last checked frame the reference: call it once its inference succeeded."""
+        if self._gray is not None:
+            self._reference = self._gray
+            self._reference_time = time.time() if now is None else now
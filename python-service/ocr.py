@@ -0,0 +1,198 @@
+# python-service/ocr.py
+
+import collections
+import queue
+import threading
+import time
+
+import cv2
+
+try:
+    import pytesseract
+except ImportError: # Optional; the placeholder backend is used instead
+    pytesseract = None
+
+# --- Configuration ---
+UNKNOWN_PLATE = "XX 00 XX 0000"   # What run_ocr has always returned when it can't read a plate
+OCR_WORKERS = 2
+OCR_BATCH_SIZE = 8
+OCR_BATCH_WAIT = 0.05             # Seconds to wait for a batch to fill up
+MAX_OCR_PER_SECOND = 4            # Per camera; requests over the budget get the best cached read
+ACCEPT_CONFIDENCE = 0.8           # A cached read this good is never OCR'd again
+PLATE_CACHE_SIZE = 2048           # Tracks remembered (LRU)
+
+
+# --- Backends: read_batch(images) -> [(text, confidence 0..1)] ---
+
+class PlaceholderBackend:
+    """CPU-only, dependency-free backend: returns UNKNOWN_PLATE with zero confidence."""
+
+    name = "placeholder"
+
+    def read_batch(self, images):
+        return [(UNKNOWN_PLATE, 0.0) for _ in images]
+
+
+class TesseractBackend:
+    """Tesseract via pytesseract, on CPU. Crops are grayscaled and upscaled before reading."""
+
+    name = "tesseract"
+    CONFIG = "--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+    def read_batch(self, images):
+        return [self._read(image) for image in images]
+
+    def _read(self, image):
+        if image is None or image.size == 0:
+            return (UNKNOWN_PLATE, 0.0)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        if gray.shape[0] < 64:
+            scale = 64 / gray.shape[0]
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        data = pytesseract.image_to_data(gray, config=self.CONFIG, output_type=pytesseract.Output.DICT)
+        words = [(w, float(c)) for w, c in zip(data['text'], data['conf']) if w.strip() and float(c) >= 0]
+        if not words:
+            return (UNKNOWN_PLATE, 0.0)
+        text = ' '.join(w for w, _ in words)
+        confidence = sum(c for _, c in words) / len(words) / 100
+        return (text, confidence)
+
+
+def default_backend():
+    """Tesseract when it's installed, the placeholder otherwise."""
+    if pytesseract is not None:
+        try:
+            pytesseract.get_tesseract_version()
+            return TesseractBackend()
+        except Exception:
+            pass
+    return PlaceholderBackend()
+
+
+class RateLimiter:
+    """A token bucket: 'rate' operations per second, bursting up to 'rate'."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def allow(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class OcrStage:
+    """
+    Queues plate crops and reads them in batches on a pool of worker threads. The best read
+    per (camera, track id) is cached, so a vehicle is not OCR'd again once it has a good read,
+    and each camera is capped at MAX_OCR_PER_SECOND reads.
+    """
+
+    def __init__(self, backend=None, workers=OCR_WORKERS, max_per_second=MAX_OCR_PER_SECOND):
+        self.backend = backend or default_backend()
+        self.max_per_second = max_per_second
+        self._queue = queue.Queue()
+        self._cache = collections.OrderedDict()  # { (camera, track_id): (text, confidence) }
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+        self.reads = 0
+        self.cache_hits = 0
+        self.rate_limited = 0
+
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"ocr-{i}", daemon=True).start()
+
+    def best_read(self, camera_name, track_id):
+        with self._lock:
+            return self._cache.get((camera_name, track_id))
+
+    def submit(self, camera_name, track_id, image, callback):
+        """
+        Asks for the plate of a track. 'callback(text, confidence)' is called with the best read:
+        right away for a confident cached read or when over the camera's budget, else after OCR.
+        Without a track id there is nothing to tie reads together: the image is always read, and
+        neither the cache nor the rate limit applies.
+        """
+        if track_id is None:
+            self._queue.put((None, image, callback))
+            return
+        key = (camera_name, track_id)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[1] >= ACCEPT_CONFIDENCE:
+                self.cache_hits += 1
+                self._cache.move_to_end(key)
+                hit = cached
+            else:
+                limiter = self._limiters.setdefault(camera_name, RateLimiter(self.max_per_second))
+                hit = None if limiter.allow() else (cached or (UNKNOWN_PLATE, 0.0))
+                if hit:
+                    self.rate_limited += 1
+        if hit:
+            self._deliver(callback, hit)
+            return
+        self._queue.put((key, image, callback))
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + OCR_BATCH_WAIT
+        while len(batch) < OCR_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                reads = self.backend.read_batch([image for _, image, _ in batch])
+            except Exception as e:
+                print(f"❌ OCR batch of {len(batch)} failed: {e}")
+                reads = [(UNKNOWN_PLATE, 0.0)] * len(batch)
+
+            for (key, _, callback), read in zip(batch, reads):
+                self._deliver(callback, self._remember(key, read))
+
+    @staticmethod
+    def _deliver(callback, read):
+        """Hands a read to its callback; a failing callback must not take the OCR thread down."""
+        try:
+            callback(*read)
+        except Exception as e:
+            print(f"❌ OCR callback failed: {e}")
+
+    def _remember(self, key, read):
+        """Keeps the higher-confidence read for the track; returns the best one."""
+        with self._lock:
+            self.reads += 1
+            if key is None:
+                return read
+            cached = self._cache.get(key)
+            best = read if cached is None or read[1] > cached[1] else cached
+            self._cache[key] = best
+            self._cache.move_to_end(key)
+            while len(self._cache) > PLATE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return best
+
+
+_default_stage = None
+
+def get_ocr_stage():
+    """The process-wide OcrStage, created on first use."""
+    global _default_stage
+    if _default_stage is None:
+        _default_stage = OcrStage()
+    return _default_stage
@@ -0,0 +1,203 @@
+# python-service/outbox.py
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import requests
+
+# --- Configuration ---
+OUTBOX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox.db")
+BULK_ENDPOINT = "http://localhost:5001/api/violations/bulk"
+BATCH_SIZE = 100
+LEASE_SECONDS = 30          # A claimed batch is retried if its shipper doesn't finish by then
+BACKOFF_BASE = 1.0          # Seconds; doubles per failed attempt...
+BACKOFF_MAX = 300.0         # ...up to this
+IDLE_POLL_INTERVAL = 5.0    # Shipper wake-up when nothing is appended (other processes share the file)
+REQUEST_TIMEOUT = (3.05, 30)
+# WAL + NORMAL survives process crashes; use "FULL" to also survive power loss, at a cost per append
+SQLITE_SYNCHRONOUS = "NORMAL"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt_at, id);
+"""
+
+
+def backoff_seconds(attempts):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempts))
+
+
+class ViolationOutbox:
+    """
+    A durable, on-disk queue of violations (SQLite in WAL mode). append() only writes a row; a
+    background shipper claims due rows in batches, POSTs them to the bulk endpoint and deletes
+    what the server acknowledged. Every violation carries an idempotency key, so redelivery after
+    a timeout or crash is harmless (at-least-once delivery, deduplicated by the server).
+    Several processes may share one outbox file: batches are claimed with a lease.
+    """
+
+    def __init__(self, path=OUTBOX_PATH, endpoint=BULK_ENDPOINT, start_shipper=True):
+        self.path = path
+        self.endpoint = endpoint
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._session = requests.Session()
+
+        self.appended = 0
+        self.delivered = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        self._failures = 0          # Consecutive failed deliveries, for the backoff
+        self._retry_at = 0.0
+
+        if start_shipper:
+            threading.Thread(target=self._ship_forever, name="violation-outbox", daemon=True).start()
+
+    def append(self, payload):
+        """Stores a violation for delivery. Returns its idempotency key."""
+        payload = dict(payload)
+        key = payload.setdefault("idempotencyKey", uuid.uuid4().hex)
+        now = time.time()
+        # The server would otherwise stamp it with the delivery time
+        payload.setdefault("timestamp", datetime.fromtimestamp(now, timezone.utc).isoformat())
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, payload, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payload), now, now)
+            )
+        self.appended += 1
+        self._wake.set()
+        return key
+
+    def pending(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _claim_batch(self):
+        """Leases up to BATCH_SIZE due rows to this shipper. Returns [(id, attempts, payload)]."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, attempts, payload FROM outbox WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                    (now, BATCH_SIZE)
+                ).fetchall()
+                if rows:
+                    self._db.executemany(
+                        "UPDATE outbox SET next_attempt_at = ? WHERE id = ?",
+                        [(now + LEASE_SECONDS, row[0]) for row in rows]
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return rows
+
+    def ship_once(self):
+        """Delivers one batch. Returns the number of rows acknowledged, or None if delivery failed."""
+        rows = self._claim_batch()
+        if not rows:
+            return 0
+        violations = [json.loads(payload) for _, _, payload in rows]
+
+        try:
+            response = self._session.post(self.endpoint, json={"violations": violations}, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            result = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Back off the whole shipper (the server is the problem, not the rows)
+            self._retry_at = time.time() + backoff_seconds(self._failures)
+            self._failures += 1
+            self.failed_batches += 1
+            self._reschedule(rows)
+            print(f"❌ Violation outbox: delivery of {len(rows)} failed ({e}); "
+                  f"{self.pending()} pending, retrying in {self._retry_at - time.time():.1f}s")
+            return None
+        self._failures = 0
+
+        accepted = set(result.get("accepted", []))
+        rejected = {r.get("idempotencyKey"): r.get("msg") for r in result.get("rejected", [])}
+        for key, msg in rejected.items():
+            # Invalid on the server: retrying can't help
+            print(f"❌ Violation {key} rejected by server: {msg}")
+
+        # Anything the server didn't answer for goes back in the queue
+        answered = accepted | set(rejected)
+        done = [row[0] for row, v in zip(rows, violations) if v["idempotencyKey"] in answered]
+        retry = [row for row, v in zip(rows, violations) if v["idempotencyKey"] not in answered]
+        with self._lock:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in done])
+        if retry:
+            self._retry_at = time.time() + BACKOFF_BASE
+            self._reschedule(retry)
+
+        self.delivered += len(accepted)
+        self.rejected += len(rejected)
+        if accepted:
+            print(f"✅ {len(accepted)} violation(s) delivered")
+        return len(done)
+
+    def _reschedule(self, rows):
+        """Makes rows due again at the shipper's retry time, so they go out together in one batch."""
+        if not rows:
+            return
+        retry_at = max(self._retry_at, time.time())
+        with self._lock:
+            self._db.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+                [(attempts + 1, retry_at, row_id) for row_id, attempts, _ in rows]
+            )
+
+    def _next_due_in(self):
+        with self._lock:
+            next_at = self._db.execute("SELECT MIN(next_attempt_at) FROM outbox").fetchone()[0]
+        if next_at is None:
+            return IDLE_POLL_INTERVAL
+        return min(max(next_at - time.time(), 0), IDLE_POLL_INTERVAL)
+
+    def _ship_forever(self):
+        while True:
+            self._wake.clear()
+            try:
+                shipped = self.ship_once()
+            except sqlite3.Error as e:
+                print(f"❌ Violation outbox: database error: {e}")
+                time.sleep(IDLE_POLL_INTERVAL)
+                continue
+            if shipped is None:
+                time.sleep(max(self._retry_at - time.time(), 0))
+            elif shipped:
+                continue # Keep draining while batches are going through
+            else:
+                self._wake.wait(self._next_due_in())
+
+
+_default_outbox = None
+_default_outbox_lock = threading.Lock()
+
+def get_outbox():
+    """The process-wide ViolationOutbox, created on first use."""
+    global _default_outbox
+    with _default_outbox_lock:
+        if _default_outbox is None:
+            _default_outbox = ViolationOutbox()
+    return _default_outbox
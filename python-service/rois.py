@@ -0,0 +1,117 @@
+# python-service/rois.py
+
+import cv2
+import numpy as np
+
+
+class CompiledROI:
+    """An ROI turned into ready-to-use geometry: polygon, area, tight bbox and cropped mask."""
+
+    __slots__ = ('name', 'type', 'points', 'polygon', 'area', 'bbox', 'mask', 'label_pos', '_scratch')
+
+    def __init__(self, name, roi_type, points):
+        self.name = name
+        self.type = roi_type
+        self.points = points
+        self.polygon = np.array(points, np.int32)
+        self.area = cv2.contourArea(self.polygon)
+
+        # Tight bounding box (x1, y1, x2, y2), exclusive on the right/bottom
+        x, y, w, h = cv2.boundingRect(self.polygon)
+        self.bbox = (x, y, x + w, y + h)
+
+        # The filled polygon, cropped to the bbox so it never costs a full frame
+        self.mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(self.mask, [self.polygon - np.array([x, y], np.int32)], 255)
+
+        # Reused every tick for the occupancy calculation
+        self._scratch = np.zeros((h, w), dtype=np.uint8)
+        self.label_pos = (points[0][0], points[0][1] - 10)
+
+    def occupancy(self, boxes):
+        """Returns the % of the ROI area covered by the given int (K, 4) x1,y1,x2,y2 boxes."""
+        if self.area == 0:
+            return 0.0
+
+        scratch = self._scratch
+        scratch.fill(0)
+        x0, y0 = self.bbox[0], self.bbox[1]
+        for x1, y1, x2, y2 in boxes:
+            cv2.rectangle(scratch, (int(x1) - x0, int(y1) - y0), (int(x2) - x0, int(y2) - y0), 255, -1)
+
+        cv2.bitwise_and(scratch, self.mask, dst=scratch)
+        return (cv2.countNonZero(scratch) / self.area) * 100
+
+
+class ROICompiler:
+    """Compiles a camera's 'rois' config, reusing the compiled ROI for every entry that hasn't changed."""
+
+    def __init__(self):
+        self._cache = {}
+        self.edge_table = build_edge_table([])
+
+    def compile(self, rois):
+        """Returns the list of CompiledROI for a config, skipping incomplete entries."""
+        compiled = []
+        cache = {}
+        for roi in rois:
+            roi_name = roi.get('name')
+            roi_type = roi.get('type')
+            roi_points = roi.get('points')
+
+            if not roi_name or not roi_type or not roi_points:
+                continue
+
+            key = (roi_name, roi_type, tuple(tuple(p) for p in roi_points))
+            compiled_roi = self._cache.get(key) or CompiledROI(roi_name, roi_type, roi_points)
+            cache[key] = compiled_roi
+            compiled.append(compiled_roi)
+
+        # Only keep what the current config uses, so old ROIs don't pile up
+        self._cache = cache
+        self.edge_table = build_edge_table(compiled)
+        return compiled
+
+
+def build_edge_table(compiled_rois):
+    """
+    Stacks the edges of every ROI polygon into (R, E) arrays of x1, y1, x2, y2.
+    Polygons with fewer than E vertices are padded with zero-length edges on their last vertex.
+    """
+    num_edges = max((len(roi.polygon) for roi in compiled_rois), default=1)
+    starts = np.zeros((len(compiled_rois), num_edges, 2), dtype=np.float64)
+    ends = np.zeros_like(starts)
+    for r, roi in enumerate(compiled_rois):
+        polygon = roi.polygon.reshape(-1, 2)
+        n = len(polygon)
+        starts[r, :n] = polygon
+        starts[r, n:] = polygon[-1]
+        ends[r, :n] = np.roll(polygon, -1, axis=0)
+        ends[r, n:] = polygon[-1]
+    return starts[..., 0], starts[..., 1], ends[..., 0], ends[..., 1]
+
+
+def points_in_rois(points, edge_table):
+    """
+    Returns a (N, R) bool matrix telling which of the N (x, y) points fall in each ROI.
+    Points on a polygon edge count as inside, matching cv2.pointPolygonTest(...) >= 0.
+    """
+    x1, y1, x2, y2 = edge_table
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    px = points[:, 0, None, None]
+    py = points[:, 1, None, None]
+
+    # Ray casting: count the edges crossed by a ray going right from each point
+    straddles = (y1 > py) != (y2 > py)
+    dy = np.where(y2 == y1, 1.0, y2 - y1)
+    x_at_py = x1 + (py - y1) * (x2 - x1) / dy
+    crossings = np.count_nonzero(straddles & (px < x_at_py), axis=2)
+
+    # Points lying exactly on an edge (collinear and within its extent)
+    collinear = (x2 - x1) * (py - y1) - (y2 - y1) * (px - x1) == 0
+    on_edge = (
+        collinear
+        & (px >= np.minimum(x1, x2)) & (px <= np.maximum(x1, x2))
+        & (py >= np.minimum(y1, y2)) & (py <= np.maximum(y1, y2))
+    )
+    return (crossings % 2 == 1) | on_edge.any(axis=2)
@@ -0,0 +1,210 @@
+# python-service/serial_writer.py
+
+import threading
+import time
+
+import serial
+
+# --- Configuration ---
+BAUD_RATE = 9600
+WRITE_TIMEOUT = 1.0         # A write that takes longer than this means the port is wedged
+RECONNECT_DELAY = 0.5       # Seconds; doubles per failed attempt...
+RECONNECT_DELAY_MAX = 10.0  # ...up to this
+BOOT_DELAY = 2.0            # Opening the port resets the Arduino (DTR); its bootloader drops what arrives meanwhile
+KEEPALIVE_INTERVAL = 2.0    # Re-send the current state after this long without a write; None disables it
+
+
+def parse_command(command):
+    """'G,R,R,R' -> ('G', 'R', 'R', 'R'): one light state per lane, in the server's LANE_SEQUENCE order."""
+    return tuple(state.strip().upper() for state in command.strip().split(','))
+
+
+class SerialWriter:
+    """
+    Owns the Arduino's serial port on a dedicated thread. Commands only update the desired
+    state of each lane; the thread writes the latest full state whenever it differs from what
+    the Arduino last received. So a burst of commands collapses into one write, repeated states
+    are never sent, and a slow port can't back up into the caller. The port is opened by start()
+    and reopened automatically when it fails; nothing is written until the board has had
+    'boot_delay' to come out of the reset that opening it causes. The current state is re-sent
+    every 'keepalive_interval', so a board that reset without the port noticing catches up.
+    """
+
+    def __init__(self, port, baud_rate=BAUD_RATE, open_port=None, on_written=None,
+                 boot_delay=BOOT_DELAY, keepalive_interval=KEEPALIVE_INTERVAL):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.boot_delay = boot_delay
+        self.keepalive_interval = keepalive_interval
+        # on_written(trace, write_started, write_done): wall-clock times, for latency tracing
+        self.on_written = on_written
+        self._open_port = open_port or (lambda: serial.Serial(port=port, baudrate=baud_rate, timeout=.1, write_timeout=WRITE_TIMEOUT))
+        self._serial = None
+        self._cond = threading.Condition()
+        self._desired = ()          # Latest state per lane
+        self._desired_trace = None  # Trace of the command that set it
+        self._unsent = False        # The desired state hasn't been picked up for writing yet
+        self._written = None        # What the Arduino has; None = unknown (e.g. after a reconnect)
+        self._written_at = None     # time.monotonic() of the last successful write
+        self._ready_at = 0.0        # time.monotonic() when the freshly opened board is done booting
+        self._running = False
+        self._thread = None
+
+        self.received = 0           # Commands submitted
+        self.coalesced = 0          # Commands superseded before they were written
+        self.unchanged = 0          # Commands that didn't change any lane
+        self.writes = 0
+        self.keepalives = 0         # Writes that only repeated the current state
+        self.reconnects = 0
+        self.last_write_seconds = 0.0
+
+    def start(self):
+        self._running = True
+        self._open() # Start the board's reset now; if it fails, the thread keeps retrying
+        self._thread = threading.Thread(target=self._run, name="serial-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, command, trace=None):
+        """
+        Queues a command string like 'G,R,R,R'. Never blocks on the port. 'trace' is any dict;
+        it gets 'enqueuedAt' and is handed to on_written if this command's state is written.
+        """
+        states = parse_command(command)
+        if trace is not None:
+            trace['enqueuedAt'] = time.time()
+        with self._cond:
+            self.received += 1
+            # Lanes the command doesn't mention keep their state
+            desired = states + self._desired[len(states):]
+            if desired == self._desired:
+                self.unchanged += 1
+                return
+            if self._unsent:
+                self.coalesced += 1 # The pending state is replaced before it went out
+            self._desired = desired
+            self._desired_trace = trace
+            self._unsent = True
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return self._desired != self._written and bool(self._desired)
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "writes": self.writes,
+            "keepalives": self.keepalives,
+            "coalesced": self.coalesced,
+            "unchanged": self.unchanged,
+            "reconnects": self.reconnects,
+            "last_write_ms": round(self.last_write_seconds * 1000, 3),
+            "connected": self._serial is not None,
+        }
+
+    def stop(self, timeout=2.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        self._close()
+
+    def _open(self):
+        """One attempt at opening the port. True on success."""
+        try:
+            self._serial = self._open_port()
+        except (serial.SerialException, OSError) as e:
+            print(f"❌ Could not open Arduino port '{self.port}': {e}.")
+            return False
+        self._ready_at = time.monotonic() + self.boot_delay
+        with self._cond:
+            self._written = None # Whatever the board had is gone after the reset
+        print(f"✅ Connected to Arduino on port {self.port}.")
+        return True
+
+    def _connect(self):
+        """Opens the port, retrying with backoff until it works or the writer is stopped."""
+        delay = RECONNECT_DELAY
+        while self._running:
+            if self._open():
+                return True
+            print(f"   Retrying in {delay:.1f}s...")
+            with self._cond:
+                self._cond.wait(delay)
+            delay = min(delay * 2, RECONNECT_DELAY_MAX)
+        return False
+
+    def _wait_for_boot(self):
+        """Holds writes until the board has booted. False if the writer was stopped meanwhile."""
+        with self._cond:
+            while self._running:
+                remaining = self._ready_at - time.monotonic()
+                if remaining <= 0:
+                    return True
+                self._cond.wait(remaining)
+        return False
+
+    def _keepalive_in(self):
+        """Seconds until the current state is due to be re-sent; None if no re-send is scheduled."""
+        if self.keepalive_interval is None or not self._desired or self._written_at is None:
+            return None
+        return self._written_at + self.keepalive_interval - time.monotonic()
+
+    def _close(self):
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except (serial.SerialException, OSError):
+                pass
+            self._serial = None
+
+    def _run(self):
+        while self._running:
+            if self._serial is None and not self._connect():
+                return
+            if not self._wait_for_boot():
+                return
+
+            with self._cond:
+                while self._running and (not self._desired or self._desired == self._written):
+                    keepalive_in = self._keepalive_in()
+                    if keepalive_in is not None and keepalive_in <= 0:
+                        break
+                    self._cond.wait(keepalive_in)
+                if not self._running:
+                    return
+                states = self._desired
+                keepalive = states == self._written
+                trace = None if keepalive else self._desired_trace
+                self._unsent = False
+
+            data = (','.join(states) + '\n').encode('utf-8') # Add a newline character for the Arduino to read
+            start = time.perf_counter()
+            write_started = time.time()
+            try:
+                self._serial.write(data)
+                self._serial.flush()
+                # Don't outrun the wire (10 bits per byte): a backlog in the driver's buffer would
+                # hold stale states that newer commands can no longer replace
+                remaining = len(data) * 10 / self.baud_rate - (time.perf_counter() - start)
+                if remaining > 0:
+                    time.sleep(remaining)
+            except (serial.SerialException, OSError) as e:
+                print(f"❌ Error writing to Arduino: {e}. Reconnecting...")
+                self._close()
+                self.reconnects += 1
+                with self._cond:
+                    self._written = None # The Arduino may have reset; send the state again
+                continue
+
+            self.last_write_seconds = time.perf_counter() - start
+            self.writes += 1
+            if keepalive:
+                self.keepalives += 1
+            with self._cond:
+                self._written = states
+                self._written_at = time.monotonic()
+            if self.on_written and trace is not None:
+                self.on_written(trace, write_started, write_started + self.last_write_seconds)
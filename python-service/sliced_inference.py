@@ -0,0 +1,246 @@
+# python-service/sliced_inference.py
+
+import collections
+import time
+
+import cv2
+import numpy as np
+from sahi.postprocess.combine import batched_greedy_nmm
+from sahi.slicing import get_slice_bboxes
+
+from detections import Detections
+from timing import NULL_TIMER
+
+# --- Configuration (same slicing and postprocessing as get_sliced_prediction in main.py) ---
+SLICE_HEIGHT = 640
+SLICE_WIDTH = 640
+OVERLAP_RATIO = 0.2
+POSTPROCESS_MATCH_METRIC = 'IOS'
+POSTPROCESS_MATCH_THRESHOLD = 0.5
+MAX_IMAGES_PER_FORWARD = 16  # Slices per forward pass; bigger batches are split into a few passes
+ROI_SLICE_MARGIN = 64        # Pixels added around each ROI bbox when picking the slices to run
+SIGNATURE_CELL = 32          # A slice's signature is its thumbnail with one pixel per 32x32 cell
+SLICE_CHANGE_THRESHOLD = 12  # Largest per-cell colour change (0-255) that still counts as unchanged
+SLICE_CACHE_SIZE = 64        # Slices remembered per camera (LRU)
+SLICE_CACHE_MAX_AGE = 30     # Seconds a cached slice result may be reused before it is re-run
+
+
+def get_slices(frame_shape):
+    """Returns the [x1, y1, x2, y2] slice boxes SAHI would cut from a frame of this shape."""
+    height, width = frame_shape[:2]
+    return get_slice_bboxes(
+        image_height=height, image_width=width,
+        slice_height=SLICE_HEIGHT, slice_width=SLICE_WIDTH,
+        overlap_height_ratio=OVERLAP_RATIO, overlap_width_ratio=OVERLAP_RATIO
+    )
+
+
+def get_roi_slices(frame_shape, compiled_rois, margin=ROI_SLICE_MARGIN):
+    """
+    Returns only the slices that overlap the union of the ROI bounding boxes (grown by 'margin').
+    Anything detected in the other slices could never be counted in an ROI.
+    """
+    regions = [
+        (roi.bbox[0] - margin, roi.bbox[1] - margin, roi.bbox[2] + margin, roi.bbox[3] + margin)
+        for roi in compiled_rois
+    ]
+    return [
+        s for s in get_slices(frame_shape)
+        if any(s[0] < rx2 and rx1 < s[2] and s[1] < ry2 and ry1 < s[3] for rx1, ry1, rx2, ry2 in regions)
+    ]
+
+
+def slice_signature(image):
+    """A small thumbnail of the image (one pixel per SIGNATURE_CELL block), cheap to compare."""
+    height, width = image.shape[:2]
+    size = (max(1, width // SIGNATURE_CELL), max(1, height // SIGNATURE_CELL))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+class SliceCache:
+    """
+    One camera's last model output per slice box, with the signature of the image it came from.
+    A slice whose signature is within SLICE_CHANGE_THRESHOLD of the cached one reuses the output
+    instead of going through the model. Signatures are compared with the image that produced the
+    output, not the previous frame's, so slow changes add up until the slice is re-run.
+    """
+
+    def __init__(self, max_entries=SLICE_CACHE_SIZE, max_age=SLICE_CACHE_MAX_AGE, threshold=SLICE_CHANGE_THRESHOLD):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.threshold = threshold
+        self.entries = collections.OrderedDict() # box -> (signature, output, stored_at)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0   # Misses because the entry was older than max_age
+        self.evictions = 0
+
+    def lookup(self, box, image, now=None):
+        """Returns (signature, cached output or None) for the image cut at 'box'."""
+        now = time.monotonic() if now is None else now
+        signature = slice_signature(image)
+        entry = self.entries.get(box)
+        if entry is not None:
+            cached_signature, output, stored_at = entry
+            if now - stored_at > self.max_age:
+                self.expired += 1
+            elif cached_signature.shape == signature.shape and \
+                    np.abs(signature - cached_signature).max() <= self.threshold:
+                self.entries.move_to_end(box)
+                self.hits += 1
+                return signature, output
+        self.misses += 1
+        return signature, None
+
+    def store(self, box, signature, output, now=None):
+        self.entries[box] = (signature, output, time.monotonic() if now is None else now)
+        self.entries.move_to_end(box)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "expired": self.expired, "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
+
+
+def run_model(images, detection_model):
+    """
+    Runs the underlying YOLOv8 model on a list of images in as few forward passes as possible.
+    Returns one (K, 6) float32 array of x1, y1, x2, y2, score, class_id per image.
+    """
+    outputs = []
+    for start in range(0, len(images), MAX_IMAGES_PER_FORWARD):
+        # Reverse the channels the same way SAHI does before calling the model
+        chunk = [image[:, :, ::-1] for image in images[start:start + MAX_IMAGES_PER_FORWARD]]
+        results = detection_model.model(chunk, verbose=False, device=detection_model.device)
+        for result in results:
+            data = result.boxes.data.cpu().numpy().astype(np.float32)
+            outputs.append(data[data[:, 4] >= detection_model.confidence_threshold])
+    return outputs
+
+
+def merge_predictions(predictions):
+    """
+    Greedy NMM (per class, IOS >= 0.5), the postprocessing get_sliced_prediction uses by default.
+    'predictions' is (K, 6) x1, y1, x2, y2, score, class_id in frame coordinates.
+    """
+    if len(predictions) == 0:
+        return Detections.empty()
+
+    # { kept index: [merged indices] }; SAHI 0.12 takes the (N, 6) array as numpy
+    keep_to_merge = batched_greedy_nmm(
+        predictions,
+        match_threshold=POSTPROCESS_MATCH_THRESHOLD,
+        match_metric=POSTPROCESS_MATCH_METRIC
+    )
+
+    count = len(keep_to_merge)
+    boxes = np.empty((count, 4), dtype=np.float32)
+    class_ids = np.empty(count, dtype=np.int32)
+    scores = np.empty(count, dtype=np.float32)
+    for i, (keep, merge_list) in enumerate(keep_to_merge.items()):
+        group = predictions[[keep] + list(merge_list)]
+        # Merged box is the union, merged score the max; the class follows the best score
+        boxes[i] = (group[:, 0].min(), group[:, 1].min(), group[:, 2].max(), group[:, 3].max())
+        best = int(np.argmax(group[:, 4]))
+        scores[i] = group[best, 4]
+        class_ids[i] = int(group[best, 5])
+    return Detections(boxes, class_ids, scores)
+
+
+def predict_sliced_batch(frames, detection_model, slices_per_frame=None, timer=NULL_TIMER, caches=None, with_coarse=False):
+    """
+    Sliced prediction for several frames at once: the slices of every frame (plus each full frame,
+    like SAHI's standard prediction) are stacked into one batch, then merged back per frame.
+    'slices_per_frame' optionally overrides the slice boxes used for each frame (None entries mean all).
+    'caches' optionally gives a SliceCache per frame (None entries mean no caching): unchanged
+    slices reuse their cached output, and only the rest go through the model.
+    Returns one Detections per frame; with 'with_coarse', one (Detections, coarse Detections) per
+    frame, where the coarse ones come from the full-frame prediction alone (no extra model work).
+    """
+    with timer.stage('slicing'):
+        images = []
+        owners = []   # (frame index, x offset, y offset) for each image in the batch
+        to_store = [] # (cache, box, signature) for each image in the batch, or None
+        reused = []   # (owner, output) taken from the caches
+        full_frame = [None] * len(frames) # Output of each full-frame prediction, or its index in 'images'
+        for frame_index, frame in enumerate(frames):
+            all_slices = get_slices(frame.shape)
+            slices = slices_per_frame[frame_index] if slices_per_frame is not None else None
+            boxes = [tuple(box) for box in (slices if slices is not None else all_slices)]
+            # The standard full-frame prediction only depends on the frame, as in SAHI
+            full_box = (0, 0, frame.shape[1], frame.shape[0]) if len(all_slices) > 1 else None
+            if full_box:
+                boxes.append(full_box)
+            cache = caches[frame_index] if caches is not None else None
+
+            for box in boxes:
+                x1, y1, x2, y2 = box
+                image = frame[y1:y2, x1:x2]
+                owner = (frame_index, x1, y1)
+                if cache is None:
+                    to_store.append(None)
+                else:
+                    signature, output = cache.lookup(box, image)
+                    if output is not None:
+                        reused.append((owner, output))
+                        if box == full_box:
+                            full_frame[frame_index] = output
+                        continue
+                    to_store.append((cache, box, signature))
+                if box == full_box:
+                    full_frame[frame_index] = len(images)
+                images.append(image)
+                owners.append(owner)
+
+    with timer.stage('inference'):
+        outputs = run_model(images, detection_model) if images else []
+
+    for entry, output in zip(to_store, outputs):
+        if entry is not None:
+            cache, box, signature = entry
+            cache.store(box, signature, output)
+
+    with timer.stage('merge'):
+        results = _merge_per_frame(frames, owners + [owner for owner, _ in reused],
+                                   outputs + [output for _, output in reused])
+        if not with_coarse:
+            return results
+        coarse = []
+        for frame_index, (frame, detections) in enumerate(zip(frames, results)):
+            output = full_frame[frame_index]
+            if output is None:
+                coarse.append(detections) # A frame no bigger than one slice: nothing coarser to give
+            else:
+                output = outputs[output] if isinstance(output, int) else output
+                coarse.append(_merge_per_frame([frame], [(0, 0, 0)], [output])[0])
+        return list(zip(results, coarse))
+
+
+def _merge_per_frame(frames, owners, outputs):
+    """Shifts every image's output back into its frame and merges each frame's predictions."""
+    per_frame = [[] for _ in frames]
+    for (frame_index, x_offset, y_offset), output in zip(owners, outputs):
+        if len(output) == 0:
+            continue
+        shifted = output.copy()
+        shifted[:, [0, 2]] += x_offset
+        shifted[:, [1, 3]] += y_offset
+        per_frame[frame_index].append(shifted)
+
+    results = []
+    for frame, outputs in zip(frames, per_frame):
+        if not outputs:
+            results.append(Detections.empty())
+            continue
+        predictions = np.concatenate(outputs)
+
+        # Clip to the frame and drop boxes that collapsed to nothing
+        height, width = frame.shape[:2]
+        predictions[:, [0, 2]] = np.clip(predictions[:, [0, 2]], 0, width)
+        predictions[:, [1, 3]] = np.clip(predictions[:, [1, 3]], 0, height)
+        valid = (predictions[:, 2] > predictions[:, 0]) & (predictions[:, 3] > predictions[:, 1])
+        results.append(merge_predictions(predictions[valid]))
+    return results
@@ -0,0 +1,246 @@
+# python-service/supervisor.py
+
+import os
+import time
+from multiprocessing import Process
+
+import cv2
+
+try:
+    import torch
+except ImportError: # Workers without a local model don't need it
+    torch = None
+
+# --- Configuration ---
+RESTART_BACKOFF = 1.0         # Seconds before the first restart; doubles per quick crash...
+RESTART_BACKOFF_MAX = 60.0    # ...up to this
+STABLE_AFTER = 60.0           # A worker that ran this long gets its backoff reset
+HEARTBEAT_TIMEOUT = 30.0      # No metrics snapshot for this long marks a worker 'stale'
+THREAD_BUDGET = None          # Threads shared by all workers; None = one per available CPU
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+
+def available_cpus():
+    """The CPUs this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_cpu_sets(weights, cpus):
+    """
+    Splits 'cpus' between workers by weight ({ name: weight }). A worker whose share comes to at
+    least one CPU gets a contiguous set of its own, sized by that share; the rest (e.g. light camera
+    workers next to the inference server) share the CPUs left over, one CPU each, round-robin.
+    Returns { name: [cpu, ...] }.
+    """
+    names = sorted(weights)
+    if not names:
+        return {}
+    total = sum(weights[name] for name in names)
+    shares = {name: len(cpus) * weights[name] / total for name in names}
+    exclusive = [name for name in names if shares[name] >= 1]
+    shared = [name for name in names if shares[name] < 1]
+
+    plan, start = {}, 0
+    reserved = 1 if shared else 0 # Keep at least one CPU for the workers that share
+    for i, name in enumerate(exclusive):
+        still_to_come = len(exclusive) - i - 1
+        if still_to_come == 0 and not shared:
+            size = len(cpus) - start
+        else:
+            size = min(round(shares[name]), len(cpus) - start - still_to_come - reserved)
+        size = max(1, size)
+        plan[name] = cpus[start:start + size]
+        start += size
+
+    pool = cpus[start:] or cpus[-1:]
+    for i, name in enumerate(shared):
+        plan[name] = [pool[i % len(pool)]]
+    return plan
+
+
+def apply_thread_budget(threads):
+    """Caps this process's OpenMP/BLAS, OpenCV and torch thread pools at 'threads'."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    cv2.setNumThreads(threads)
+    if torch is not None:
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass # Only allowed before torch's first parallel work (e.g. when forked from a parent that used it)
+
+
+def _run_worker(name, target, args, cpus, threads):
+    """Process entry point: pin, set the thread budget, then run the worker."""
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    apply_thread_budget(threads)
+    print(f"[{name}] Pinned to CPUs {cpus}, {threads} thread(s).")
+    target(*args)
+
+
+class WorkerSpec:
+    """One supervised worker: what to run, how it's placed, and its restart bookkeeping."""
+
+    def __init__(self, name, target, args, weight, reports_metrics):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.weight = weight
+        self.reports_metrics = reports_metrics # Whether metrics snapshots count as its heartbeat
+        self.process = None
+        self.cpus = []
+        self.threads = 1
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = RESTART_BACKOFF
+        self.restart_at = None     # Set while waiting to restart after a crash
+        self.finished = False      # Exited cleanly (code 0): nothing to retry
+        self.last_exit_code = None
+
+
+class Supervisor:
+    """
+    Runs the manager's worker processes. Each worker is pinned to its own CPU set and gets a share
+    of THREAD_BUDGET, so N workers don't each spin up a thread per core. check() restarts workers
+    that died with a non-zero exit code, with exponential backoff for ones that keep crashing.
+    health() reports per worker.
+    """
+
+    def __init__(self, worker_pids=None, heartbeat=None, thread_budget=THREAD_BUDGET):
+        self.cpus = available_cpus()
+        self.thread_budget = thread_budget or len(self.cpus)
+        self.worker_pids = worker_pids if worker_pids is not None else {}
+        self.heartbeat = heartbeat # heartbeat(name) -> epoch time of the worker's last metrics snapshot
+        self.specs = {}
+
+    def start(self, name, target, args=(), weight=1, reports_metrics=True):
+        """Starts a supervised worker. 'weight' sizes its CPU set and thread share."""
+        self.specs[name] = WorkerSpec(name, target, args, weight, reports_metrics)
+        self._rebalance()
+        self._spawn(self.specs[name])
+
+    def set_args(self, name, args):
+        """The arguments used for the worker's next (re)start."""
+        if name in self.specs:
+            self.specs[name].args = args
+
+    def is_finished(self, name):
+        """Whether the worker exited cleanly and won't be restarted by check()."""
+        return name in self.specs and self.specs[name].finished
+
+    def restart_finished(self, name, args):
+        """
+        Starts a worker that exited cleanly again, with new args (e.g. a camera that had no ROIs
+        and now has some). Returns False if the worker isn't in that state.
+        """
+        spec = self.specs.get(name)
+        if spec is None or not spec.finished:
+            return False
+        spec.args = args
+        spec.finished = False
+        spec.backoff = RESTART_BACKOFF
+        print(f"[Manager] Starting finished worker {name} again.")
+        self._spawn(spec)
+        return True
+
+    def stop(self, name, timeout=10):
+        """Stops supervising a worker and waits for it to exit (terminating it after 'timeout')."""
+        spec = self.specs.pop(name, None)
+        self.worker_pids.pop(name, None)
+        if spec is None or spec.process is None:
+            return
+        spec.process.join(timeout)
+        if spec.process.is_alive():
+            print(f"[Manager] Worker {name} did not stop in time; terminating it.")
+            spec.process.terminate()
+            spec.process.join()
+        self._rebalance()
+
+    def stop_all(self, timeout=10):
+        for name in list(self.specs):
+            self.stop(name, timeout)
+
+    def _rebalance(self):
+        """Re-plans CPU sets for the current workers and re-pins the running ones."""
+        plan = plan_cpu_sets({name: spec.weight for name, spec in self.specs.items()}, self.cpus)
+        total_weight = sum(spec.weight for spec in self.specs.values()) or 1
+        for name, spec in self.specs.items():
+            spec.cpus = plan[name]
+            # Thread pools are sized at startup; a running worker keeps its count until it restarts.
+            # More threads than CPUs would only fight over them
+            spec.threads = max(1, min(len(spec.cpus), round(self.thread_budget * spec.weight / total_weight)))
+            if spec.process is not None and spec.process.is_alive() and hasattr(os, 'sched_setaffinity'):
+                try:
+                    os.sched_setaffinity(spec.process.pid, spec.cpus)
+                except OSError:
+                    pass
+
+    def _spawn(self, spec):
+        spec.process = Process(target=_run_worker, args=(spec.name, spec.target, spec.args, spec.cpus, spec.threads), name=spec.name)
+        spec.process.start()
+        spec.started_at = time.time()
+        spec.restart_at = None
+        self.worker_pids[spec.name] = spec.process.pid
+
+    def check(self):
+        """Restarts workers that have exited, with backoff. Call it periodically."""
+        now = time.time()
+        for spec in self.specs.values():
+            if spec.restart_at is not None:
+                if now >= spec.restart_at:
+                    spec.restarts += 1
+                    print(f"[Manager] Restarting worker {spec.name} (restart #{spec.restarts}).")
+                    self._spawn(spec)
+                continue
+            if spec.finished or spec.process.is_alive():
+                continue
+
+            spec.last_exit_code = spec.process.exitcode
+            if spec.last_exit_code == 0:
+                # e.g. a camera without a video source or ROIs: restarting it wouldn't change anything
+                spec.finished = True
+                print(f"[Manager] Worker {spec.name} exited cleanly; not restarting it.")
+                continue
+            if now - spec.started_at >= STABLE_AFTER:
+                spec.backoff = RESTART_BACKOFF
+            spec.restart_at = now + spec.backoff
+            print(f"[Manager] ⚠️ Worker {spec.name} exited with code {spec.last_exit_code}; "
+                  f"restarting in {spec.backoff:.1f}s.")
+            spec.backoff = min(spec.backoff * 2, RESTART_BACKOFF_MAX)
+
+    def health(self):
+        """{ name: { status, pid, cpus, threads, uptime_seconds, restarts, last_exit_code, seconds_since_heartbeat } }."""
+        now = time.time()
+        report = {}
+        for name, spec in self.specs.items():
+            alive = spec.process is not None and spec.process.is_alive()
+            last_beat = self.heartbeat(name) if self.heartbeat and spec.reports_metrics else None
+            since_beat = now - last_beat if last_beat else None
+            if spec.restart_at is not None:
+                status = 'restarting'
+            elif spec.finished:
+                status = 'exited'
+            elif not alive:
+                status = 'down'
+            elif not spec.reports_metrics:
+                status = 'healthy'
+            elif since_beat is None:
+                status = 'starting' if now - spec.started_at < HEARTBEAT_TIMEOUT else 'stale'
+            else:
+                # A beat from before the latest restart doesn't count
+                status = 'healthy' if since_beat < HEARTBEAT_TIMEOUT and last_beat >= spec.started_at else 'stale'
+            report[name] = {
+                "status": status,
+                "pid": spec.process.pid if alive else None,
+                "cpus": spec.cpus,
+                "threads": spec.threads,
+                "uptime_seconds": round(now - spec.started_at, 1) if alive else 0,
+                "restarts": spec.restarts,
+                "last_exit_code": spec.last_exit_code,
+                "seconds_since_heartbeat": round(since_beat, 1) if since_beat is not None else None,
+            }
+        return report
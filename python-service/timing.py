@@ -0,0 +1,57 @@
+# python-service/timing.py
+
+import collections
+import contextlib
+import time
+
+import numpy as np
+
+
+class StageTimer:
+    """Collects wall-clock durations per named pipeline stage (decode, inference, ...)."""
+
+    def __init__(self, max_samples=None):
+        # max_samples bounds memory for long-running workers; None keeps everything (benchmarks)
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=max_samples))
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.samples[name].append(seconds)
+
+    def summary(self):
+        """Returns { stage: { count, mean_ms, p50_ms, p95_ms, p99_ms, total_s } }."""
+        summary = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            values = np.fromiter(samples, dtype=np.float64) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[name] = {
+                "count": len(values),
+                "mean_ms": round(float(values.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "total_s": round(float(values.sum()) / 1000, 3),
+            }
+        return summary
+
+
+class NullTimer:
+    """A StageTimer stand-in that records nothing."""
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+    def record(self, name, seconds):
+        pass
+
+
+NULL_TIMER = NullTimer()
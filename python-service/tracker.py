@@ -0,0 +1,221 @@
+# python-service/tracker.py
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError: # Optional; greedy matching is used instead
+    linear_sum_assignment = None
+
+# --- Configuration ---
+IOU_THRESHOLD = 0.3     # Minimum IoU for a detection to continue a track
+HIGH_SCORE = 0.5        # ByteTrack split: confident detections are matched first...
+LOW_SCORE = 0.1         # ...then low-score ones may only extend existing tracks
+MIN_HITS = 3            # Matches needed before a track is reported
+MAX_AGE = 30            # Frames a track survives without a match
+
+# Constant-velocity model on state [cx, cy, w, h, vx, vy, vw, vh]
+_F = np.eye(8, dtype=np.float64)
+_F[:4, 4:] = np.eye(4)
+_Q = np.diag([1, 1, 1, 1, 0.01, 0.01, 0.0001, 0.0001]).astype(np.float64)
+_R = np.diag([1, 1, 10, 10]).astype(np.float64)
+_P0 = np.diag([10, 10, 10, 10, 1e4, 1e4, 1e4, 1e4]).astype(np.float64)
+
+
+def boxes_to_measurements(boxes):
+    """x1, y1, x2, y2 -> cx, cy, w, h."""
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w, h], axis=1)
+
+
+def measurements_to_boxes(z):
+    """cx, cy, w, h -> x1, y1, x2, y2."""
+    half_w = np.maximum(z[:, 2], 0) / 2
+    half_h = np.maximum(z[:, 3], 0) / 2
+    return np.stack([z[:, 0] - half_w, z[:, 1] - half_h, z[:, 0] + half_w, z[:, 1] + half_h], axis=1)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """(A, 4) x (B, 4) x1,y1,x2,y2 boxes -> (A, B) IoU matrix."""
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def match(iou, threshold=IOU_THRESHOLD):
+    """
+    Assigns rows to columns maximizing IoU. Returns (matched row idx, matched col idx).
+    Uses the Hungarian algorithm when scipy is available, greedy highest-IoU-first otherwise.
+    """
+    if iou.size == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(-iou)
+    else:
+        # Greedy: walk the candidate pairs from best to worst, taking each row/col once
+        candidates = np.argwhere(iou >= threshold)
+        order = np.argsort(-iou[candidates[:, 0], candidates[:, 1]], kind='stable')
+        used_rows = np.zeros(iou.shape[0], dtype=bool)
+        used_cols = np.zeros(iou.shape[1], dtype=bool)
+        rows, cols = [], []
+        for r, c in candidates[order]:
+            if not used_rows[r] and not used_cols[c]:
+                used_rows[r] = used_cols[c] = True
+                rows.append(r)
+                cols.append(c)
+        rows, cols = np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)
+
+    keep = iou[rows, cols] >= threshold
+    return rows[keep], cols[keep]
+
+
+class Tracks:
+    """The tracked objects, as parallel arrays so every step is vectorized over all tracks."""
+
+    def __init__(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.x = np.zeros((0, 8))          # Kalman state
+        self.P = np.zeros((0, 8, 8))       # Kalman covariance
+        self.class_ids = np.zeros(0, dtype=np.int32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.age = np.zeros(0, dtype=np.int32)              # Frames since last match
+        self.last_boxes = np.zeros((0, 4), dtype=np.float32) # Last matched detection box
+
+    def __len__(self):
+        return len(self.ids)
+
+    def keep(self, mask):
+        for name in ('ids', 'x', 'P', 'class_ids', 'scores', 'hits', 'age', 'last_boxes'):
+            setattr(self, name, getattr(self, name)[mask])
+
+    def append(self, ids, x, P, class_ids, scores, boxes):
+        self.ids = np.concatenate([self.ids, ids])
+        self.x = np.concatenate([self.x, x])
+        self.P = np.concatenate([self.P, P])
+        self.class_ids = np.concatenate([self.class_ids, class_ids])
+        self.scores = np.concatenate([self.scores, scores])
+        self.hits = np.concatenate([self.hits, np.ones(len(ids), dtype=np.int32)])
+        self.age = np.concatenate([self.age, np.zeros(len(ids), dtype=np.int32)])
+        self.last_boxes = np.concatenate([self.last_boxes, boxes])
+
+
+class TrackedObjects:
+    """What Tracker.update returns for the confirmed tracks: ids, boxes, class ids and scores."""
+
+    __slots__ = ('ids', 'boxes', 'class_ids', 'scores')
+
+    def __init__(self, ids, boxes, class_ids, scores):
+        self.ids = ids
+        self.boxes = boxes
+        self.class_ids = class_ids
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.ids)
+
+    def centers(self):
+        return np.stack([(self.boxes[:, 0] + self.boxes[:, 2]) / 2, (self.boxes[:, 1] + self.boxes[:, 3]) / 2], axis=1)
+
+
+class Tracker:
+    """
+    A SORT/ByteTrack-style multi-object tracker: batched constant-velocity Kalman filters,
+    IoU cost matrices, and a two-stage association (high-score, then low-score detections).
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, min_hits=MIN_HITS, max_age=MAX_AGE):
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.tracks = Tracks()
+        self.frame_count = 0
+        self._next_id = 1
+
+    def _predict(self):
+        t = self.tracks
+        if len(t) == 0:
+            return
+        # Keep the predicted size positive
+        shrinking = (t.x[:, 2] + t.x[:, 6] <= 0) | (t.x[:, 3] + t.x[:, 7] <= 0)
+        t.x[shrinking, 6:8] = 0
+        t.x = t.x @ _F.T
+        t.P = _F @ t.P @ _F.T + _Q
+        t.age += 1
+
+    def _correct(self, track_idx, det_idx, boxes, class_ids, scores):
+        t = self.tracks
+        if len(track_idx) == 0:
+            return
+        z = boxes_to_measurements(boxes[det_idx].astype(np.float64))
+        x = t.x[track_idx]
+        P = t.P[track_idx]
+
+        # Batched Kalman update: S = HPH' + R, K = PH'S^-1
+        y = z - x[:, :4]
+        S = P[:, :4, :4] + _R
+        K = np.linalg.solve(S, P[:, :4, :]).transpose(0, 2, 1)  # S and P are symmetric
+        t.x[track_idx] = x + np.einsum('nij,nj->ni', K, y)
+        t.P[track_idx] = P - K @ P[:, :4, :]
+
+        t.class_ids[track_idx] = class_ids[det_idx]
+        t.scores[track_idx] = scores[det_idx]
+        t.last_boxes[track_idx] = boxes[det_idx]
+        t.hits[track_idx] += 1
+        t.age[track_idx] = 0
+
+    def update(self, boxes, class_ids, scores):
+        """
+        Advances the tracker by one frame with (N, 4) x1,y1,x2,y2 boxes, class ids and scores
+        (e.g. straight from a Detections object). Returns the confirmed TrackedObjects.
+        """
+        self.frame_count += 1
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        class_ids = np.asarray(class_ids, dtype=np.int32)
+        scores = np.asarray(scores, dtype=np.float32)
+
+        self._predict()
+        t = self.tracks
+        predicted_boxes = measurements_to_boxes(t.x[:, :4])
+
+        # 1st association: confident detections against every track
+        high = np.flatnonzero(scores >= HIGH_SCORE)
+        low = np.flatnonzero((scores >= LOW_SCORE) & (scores < HIGH_SCORE))
+        rows, cols = match(iou_matrix(predicted_boxes, boxes[high]), self.iou_threshold)
+        matched_tracks, matched_dets = rows, high[cols]
+
+        # 2nd association: low-score detections may only continue the tracks left over
+        unmatched_tracks = np.setdiff1d(np.arange(len(t)), matched_tracks)
+        rows, cols = match(iou_matrix(predicted_boxes[unmatched_tracks], boxes[low]), self.iou_threshold)
+        matched_tracks = np.concatenate([matched_tracks, unmatched_tracks[rows]])
+        matched_dets = np.concatenate([matched_dets, low[cols]])
+
+        self._correct(matched_tracks, matched_dets, boxes, class_ids, scores)
+
+        # New tracks from the confident detections nobody claimed
+        new = np.setdiff1d(high, matched_dets)
+        if len(new):
+            x = np.zeros((len(new), 8))
+            x[:, :4] = boxes_to_measurements(boxes[new].astype(np.float64))
+            ids = np.arange(self._next_id, self._next_id + len(new), dtype=np.int64)
+            self._next_id += len(new)
+            t.append(ids, x, np.repeat(_P0[None], len(new), axis=0), class_ids[new], scores[new], boxes[new])
+
+        # Drop tracks that have been lost for too long
+        t.keep(t.age <= self.max_age)
+
+        confirmed = (t.age == 0) & ((t.hits >= self.min_hits) | (self.frame_count <= self.min_hits))
+        return TrackedObjects(
+            t.ids[confirmed],
+            measurements_to_boxes(t.x[confirmed, :4]).astype(np.float32),
+            t.class_ids[confirmed],
+            t.scores[confirmed]
+        )
@@ -0,0 +1,127 @@
+# python-service/transport.py
+
+import collections
+import json
+import struct
+import threading
+import time
+
+import cv2
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- Configuration ---
+JPEG_QUALITY = 80       # 0-100, OpenCV's default is 95
+OUTPUT_WIDTH = 960      # Annotated frames are scaled down to this width (None keeps the original)
+SEND_QUEUE_SIZE = 2     # Payloads waiting to be sent; when full, a droppable one (else the oldest) goes
+SEND_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+
+# Binary payload layout: [4-byte big-endian metadata length][metadata JSON][JPEG bytes]
+BINARY_CONTENT_TYPE = 'application/octet-stream'
+HEADER = struct.Struct('>I')
+
+
+def encode_frame(frame, quality=JPEG_QUALITY, output_width=OUTPUT_WIDTH):
+    """Resizes (if needed) and JPEG-encodes a frame. Returns the JPEG as bytes."""
+    height, width = frame.shape[:2]
+    if output_width and width > output_width:
+        output_height = int(height * output_width / width)
+        frame = cv2.resize(frame, (output_width, output_height), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+
+def pack_frame_payload(metrics, jpeg_bytes):
+    """Packs the metrics dict and the raw JPEG into one length-prefixed binary body."""
+    metadata = json.dumps(metrics, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(metadata)) + metadata + jpeg_bytes
+
+
+class FrameSender:
+    """
+    Sends analysis payloads from a background thread over a pooled keep-alive session.
+    The queue is bounded, so a slow server can never stall the camera worker. When it is full,
+    a payload marked droppable (an intermediate densities-only update, which the next one
+    supersedes) is dropped first, then the oldest; full results with their frame go last.
+    """
+
+    def __init__(self, url, camera_name, queue_size=SEND_QUEUE_SIZE, timeout=SEND_TIMEOUT):
+        self.url = url
+        self.camera_name = camera_name
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        retries = Retry(total=1, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=None)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._queue = collections.deque(maxlen=queue_size)
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f"sender-{camera_name}", daemon=True)
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.last_latency = 0.0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, payload, jpeg_bytes=None, droppable=False):
+        """Queues a payload (binary when a raw JPEG is given) without ever blocking."""
+        with self._condition:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+                victim = next((i for i, entry in enumerate(self._queue) if entry[2]), None)
+                if victim is not None:
+                    del self._queue[victim]
+                elif droppable:
+                    return # Only full results are waiting; they matter more than this one
+                # else deque(maxlen) drops the oldest on append
+            self._queue.append((payload, jpeg_bytes, droppable))
+            self._condition.notify()
+
+    def queue_depth(self):
+        return len(self._queue)
+
+    def stats(self):
+        return {
+            "queueDepth": self.queue_depth(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "lastLatencyMs": round(self.last_latency * 1000, 1),
+        }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                payload, jpeg_bytes, _ = self._queue.popleft()
+            self._send(payload, jpeg_bytes)
+
+    def _send(self, payload, jpeg_bytes):
+        if jpeg_bytes is not None:
+            headers = {'Content-Type': BINARY_CONTENT_TYPE}
+            body = pack_frame_payload(payload, jpeg_bytes)
+        else:
+            headers = {'Content-Type': 'application/json'}
+            body = json.dumps(payload)
+
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+            self.last_latency = time.perf_counter() - start
+            if response.status_code == 200:
+                self.sent += 1
+            else:
+                self.failed += 1
+                print(f"[{self.camera_name}] Failed to send data. Server responded with {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            self.last_latency = time.perf_counter() - start
+            self.failed += 1
+            print(f"[{self.camera_name}] Error sending data: {e}")
@@ -1,21 +1,23 @@
 # python-service/violation_detector.py
 
+import threading
+from datetime import datetime, timezone
+
 import cv2
 import numpy as np
-import base64
-import requests
+
+from detections import Detections
+from evidence import get_evidence_store
+from ocr import UNKNOWN_PLATE, get_ocr_stage
+from outbox import get_outbox
+from tracker import Tracker
 
 print("--- 🚗 Violation Detector Module Loaded ---")
 
 # --- Configuration (Copied from main.py for now) ---
 REAL_INTERSECTION_ID = "68bf113329a3d66abae0fd7c"
 REAL_INTERSECTION_NAME = "Main & First (Real)"
-# We'll need the API endpoint to send violations
-VIOLATION_API_ENDPOINT = "http://localhost:5001/api/violations"
-
-# --- Placeholder for Object Tracker ---
-# In a real implementation, you would initialize a tracker like SORT or DeepSORT here
-# tracker = initialize_tracker()
+# Violations are delivered to the server's bulk endpoint by the outbox (see outbox.py)
 
 # --- Placeholder Violation Zones ---
 # In a real system, these would likely come from the camera config
@@ -26,115 +28,249 @@ VIOLATION_LINES = {
     "West": [(400, 100), (410, 500)],
 }
 
-# --- State Variables (should be managed per camera instance in a class) ---
-tracked_objects_history = {} # Stores previous positions, e.g., { track_id: [ (x,y), (x,y)... ] }
+OCR_TIMEOUT = 10 # Seconds a blocking run_ocr call waits for the OCR stage
+
+# --- Track History Limits (memory stays constant however long a camera runs) ---
+HISTORY_LENGTH = 5      # Positions kept per track
+STALE_AFTER_FRAMES = 60 # Tracks not seen for this many frames are evicted
+MAX_TRACKS = 512        # Hard cap; the least recently seen track goes first
+
+
+class TrackHistory:
+    """A fixed-length ring buffer of one track's recent positions."""
+
+    __slots__ = ('positions', 'count', 'head', 'last_seen', 'reported')
+
+    def __init__(self, length=HISTORY_LENGTH):
+        self.positions = np.empty((length, 2), dtype=np.float32)
+        self.count = 0
+        self.head = 0           # Where the next position goes
+        self.last_seen = 0      # Frame index of the latest position
+        self.reported = False   # Debounce: a track is reported at most once
+
+    def push(self, point, frame_index):
+        self.positions[self.head] = point
+        self.head = (self.head + 1) % len(self.positions)
+        self.count = min(self.count + 1, len(self.positions))
+        self.last_seen = frame_index
+
+    def latest(self):
+        """The most recent position, or None for an empty history."""
+        if self.count == 0:
+            return None
+        return self.positions[self.head - 1]
+
+
+class ViolationDetector:
+    """Red-light violation detection for one camera: its own tracker, lines and track histories."""
+
+    def __init__(self, camera_name, detection_model=None, camera_config=None, evidence_store=None):
+        self.camera_name = camera_name
+        self.detection_model = detection_model
+        self.evidence_store = evidence_store or get_evidence_store()
+        self.tracker = initialize_tracker()
+        self.lines = get_violation_lines(camera_name, camera_config)
+        self.histories = {} # { track_id: TrackHistory }
+        self.frame_index = 0
+
+    def process_frame(self, frame, current_light_state):
+        """
+        Analyzes a single frame for red light violations.
+        This function contains the high-load logic.
+        """
+        self.frame_index += 1
+
+        # 1. Run Object Detection
+        detections = run_detection(frame, self.detection_model)
+
+        # 2. Update Object Tracker
+        tracked_objects = self.tracker.update(detections.boxes, detections.class_ids, detections.scores)
+
+        # Keep every track's position history up to date, red light or not
+        centers = tracked_objects.centers()
+        prev_points = np.full_like(centers, np.nan)
+        reported = np.zeros(len(tracked_objects), dtype=bool)
+        for i, track_id in enumerate(tracked_objects.ids):
+            history = self.histories.get(int(track_id))
+            if history is None:
+                history = self.histories[int(track_id)] = TrackHistory()
+            elif history.count:
+                prev_points[i] = history.latest()
+            reported[i] = history.reported
+            history.push(centers[i], self.frame_index)
+        self._evict_stale()
+
+        # 3. Check for Violations: every track against every line in one pass
+        if current_light_state == "red" and len(self.lines):
+            candidates = ~np.isnan(prev_points[:, 0]) & ~reported
+            track_rows = np.flatnonzero(candidates)
+            crossings = find_line_crossings(prev_points[candidates], centers[candidates], self.lines)
+
+            for track_row, line_index, direction in zip(track_rows[crossings[0]], crossings[1], crossings[2]):
+                track_id = int(tracked_objects.ids[track_row])
+                history = self.histories[track_id]
+                if history.reported:
+                    continue # Crossed two lines in one step; one report is enough
+                history.reported = True
+                self._report_violation(frame, track_id, tracked_objects.boxes[track_row], line_index, direction)
+
+        # 4. Return annotated frame (optional)
+        annotated_frame = frame.copy()
+        for track_id, box in zip(tracked_objects.ids, tracked_objects.boxes.astype(int)):
+            # Red once the track has been reported as a violation
+            color = (0, 0, 255) if self.histories[int(track_id)].reported else (0, 255, 0)
+            cv2.rectangle(annotated_frame, tuple(box[:2]), tuple(box[2:4]), color, 2)
+            cv2.putText(annotated_frame, f"#{int(track_id)}", (box[0], max(box[1] - 5, 0)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        for line in self.lines.astype(int):
+           cv2.line(annotated_frame, tuple(line[0]), tuple(line[1]), (0, 0, 255), 2)
+
+        return annotated_frame
+
+    def _evict_stale(self):
+        """Drops tracks that haven't been seen for a while, and enforces MAX_TRACKS."""
+        cutoff = self.frame_index - STALE_AFTER_FRAMES
+        stale = [track_id for track_id, h in self.histories.items() if h.last_seen < cutoff]
+        for track_id in stale:
+            del self.histories[track_id]
+
+        overflow = len(self.histories) - MAX_TRACKS
+        if overflow > 0:
+            oldest = sorted(self.histories, key=lambda track_id: self.histories[track_id].last_seen)[:overflow]
+            for track_id in oldest:
+                del self.histories[track_id]
+
+    def _report_violation(self, frame, track_id, bbox, line_index, direction):
+        camera_name = self.camera_name
+        print(f"🚨🚨🚨 POTENTIAL VIOLATION DETECTED by object ID {track_id} "
+              f"on {camera_name} (Red Light, line {line_index}, direction {direction:+d}) 🚨🚨🚨")
+
+        # a. Crop image around the object (copied: OCR runs after this frame is gone)
+        bbox = bbox.astype(int)
+        x1, y1 = max(bbox[0], 0), max(bbox[1], 0)
+        cropped_image = frame[y1:bbox[3], x1:bbox[2]].copy()
+
+        payload = {
+            "intersectionId": REAL_INTERSECTION_ID,
+            "intersectionName": REAL_INTERSECTION_NAME,
+            "cameraName": camera_name,
+            # When it happened, not when the server gets it (delivery can be much later)
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        lock = threading.Lock()
+
+        def on_result(key, value):
+            # d. Send violation to server, once both the plate and the evidence are in
+            with lock:
+                payload[key] = value
+                ready = "licensePlate" in payload and "imageUrl" in payload
+            if ready:
+                send_violation_to_server(payload)
+
+        # b. Run Number Plate Recognition (OCR) on the OCR stage's workers, batched with
+        #    other crops and cached per track
+        run_ocr(cropped_image, camera_name, track_id, lambda plate: on_result("licensePlate", plate))
+
+        # c. Save the vehicle crop as evidence. Encoding and disk I/O happen on the evidence
+        #    pool, so this frame never waits on them
+        self.evidence_store.submit(frame, bbox, lambda image_url: on_result("imageUrl", image_url))
+
+
+# One detector per camera for callers of the function-style API
+_detectors = {}
 
 def process_frame_for_violations(frame, camera_name, detection_model, current_light_state):
+    """Analyzes a single frame for red light violations using that camera's ViolationDetector."""
+    detector = _detectors.get(camera_name)
+    if detector is None:
+        detector = _detectors[camera_name] = ViolationDetector(camera_name, detection_model)
+    return detector.process_frame(frame, current_light_state)
+
+
+# --- Line Crossing ---
+
+def get_violation_lines(camera_name, camera_config=None):
     """
-    Analyzes a single frame for red light violations.
-    This function contains the high-load logic.
+    Returns the camera's violation lines as an (L, 2, 2) float array of [[x1, y1], [x2, y2]].
+    Lines from the camera config ('violationLines') win over VIOLATION_LINES.
     """
-    height, width, _ = frame.shape
-    # print(f"[{camera_name}] Processing frame for violations...") # DEBUG
-
-    # 1. TODO: Run Object Detection (using detection_model passed from main.py)
-    # results = run_detection(frame, detection_model)
-    detections = [] # Placeholder: Replace with actual detections
-
-    # 2. TODO: Update Object Tracker
-    # tracked_objects = tracker.update(detections) # List of tracked objects with IDs and bboxes
-
-    # 3. TODO: Check for Violations
-    if current_light_state == "red":
-        # Get the violation line/zone for this camera
-        violation_line = VIOLATION_LINES.get(camera_name)
-        if violation_line:
-            # For each tracked object
-            # for obj in tracked_objects:
-                # track_id = obj.id
-                # bbox = obj.bbox
-                # current_center = ( (bbox[0]+bbox[2])/2, (bbox[1]+bbox[3])/2 )
-
-                # Add current position to history
-                # if track_id not in tracked_objects_history:
-                #     tracked_objects_history[track_id] = []
-                # tracked_objects_history[track_id].append(current_center)
-                # Keep history short (e.g., last 5 positions)
-                # tracked_objects_history[track_id] = tracked_objects_history[track_id][-5:]
-
-                # Check if the object's path crossed the violation line
-                # if len(tracked_objects_history[track_id]) > 1:
-                #     prev_pos = tracked_objects_history[track_id][-2]
-                #     curr_pos = tracked_objects_history[track_id][-1]
-                #     if did_cross_line(prev_pos, curr_pos, violation_line):
-                        # print(f"🚨🚨🚨 POTENTIAL VIOLATION DETECTED by object ID {
-                        #     # track_id
-                        #     } on {camera_name} (Red Light) 🚨🚨🚨")
-
-                        # a. TODO: Crop image around the object
-                        # cropped_image = frame[bbox[1]:bbox[3], bbox[0]:bbox[2]]
-
-                        # b. TODO: Run Number Plate Recognition (OCR)
-                        # license_plate = run_ocr(cropped_image)
-                        license_plate = "AB 12 CD 3456" # Placeholder
-
-                        # c. TODO: Save image/evidence (maybe upload?)
-                        # For now, just encode the frame
-                        _, buffer = cv2.imencode('.jpg', frame)
-                        img_str = base64.b64encode(buffer).decode('utf-8')
-                        # In reality, you'd upload the cropped image and get a URL
-                        image_url_placeholder = f"data:image/jpeg;base64,{img_str[:100]}..." # Fake URL
-
-                        # d. Send violation to server
-                        payload = {
-                            "intersectionId": REAL_INTERSECTION_ID,
-                            "intersectionName": REAL_INTERSECTION_NAME,
-                            "cameraName": camera_name,
-                            "licensePlate": license_plate,
-                            "imageUrl": image_url_placeholder # Use the actual image URL here
-                        }
-                        send_violation_to_server(payload)
-
-                        # e. Prevent reporting same object multiple times quickly
-                        # Remove from history or add debounce logic
-                        # del tracked_objects_history[track_id]
-
-
-    # 4. Return annotated frame (optional)
-    annotated_frame = frame.copy()
-    # TODO: Draw tracked bounding boxes and violation lines on annotated_frame
-    if violation_line:
-       cv2.line(annotated_frame, violation_line[0], violation_line[1], (0, 0, 255), 2)
-
-
-    return annotated_frame # Return annotated frame if needed, otherwise maybe just None
+    lines = (camera_config or {}).get('violationLines')
+    if lines is None:
+        line = VIOLATION_LINES.get(camera_name)
+        lines = [line] if line else []
+    return np.asarray(lines, dtype=np.float64).reshape(-1, 2, 2)
+
+def find_line_crossings(prev_points, curr_points, lines):
+    """
+    Vectorized segment intersection of every track's (prev -> curr) move against every line.
+    prev_points/curr_points are (T, 2), lines is (L, 2, 2).
+    Returns (track_indices, line_indices, directions) for each crossing. Direction is +1 when
+    the track moved to the side where cross(line, point - start) >= 0 (in image coordinates,
+    below a line drawn left to right) and -1 for the other way.
+    """
+    prev_points = np.asarray(prev_points, dtype=np.float64).reshape(-1, 1, 2)
+    curr_points = np.asarray(curr_points, dtype=np.float64).reshape(-1, 1, 2)
+    lines = np.asarray(lines, dtype=np.float64).reshape(1, -1, 2, 2)
+    a, b = lines[..., 0, :], lines[..., 1, :]
+
+    def cross(u, v):
+        return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+    # Which side of each line the track was on before and after (on the line counts as positive)
+    line_dir = b - a
+    side_prev = cross(line_dir, prev_points - a) >= 0
+    side_curr = cross(line_dir, curr_points - a) >= 0
+
+    # The line's endpoints must also lie on opposite sides of the track's move
+    move = curr_points - prev_points
+    d_a = cross(move, a - prev_points)
+    d_b = cross(move, b - prev_points)
+
+    crossed = (side_prev != side_curr) & (d_a * d_b <= 0)
+    track_indices, line_indices = np.nonzero(crossed)
+    directions = np.where(side_curr[track_indices, line_indices], 1, -1)
+    return track_indices, line_indices, directions
 
 
 # --- Helper Functions (Placeholders) ---
 
 def run_detection(frame, model):
-    # This would use the SAHI predictor or similar
-    return []
+    # model is main.py's LocalDetectionModel/RemoteDetectionModel (SAHI sliced prediction)
+    detections = model.predict(frame) if model is not None else None
+    return detections if detections is not None else Detections.empty()
 
 def initialize_tracker():
-    # Load SORT, DeepSORT, ByteTrack etc.
-    return None
+    # Vectorized SORT/ByteTrack-style tracker (Kalman + IoU matching), see tracker.py
+    return Tracker()
 
 def did_cross_line(point1, point2, line):
-    # Basic line segment intersection logic
-    return False # Placeholder
+    # Single-pair form of find_line_crossings
+    track_indices, _, _ = find_line_crossings([point1], [point2], [line])
+    return len(track_indices) > 0
 
-def run_ocr(image):
-    # Use Tesseract or another OCR model
-    return "XX 00 XX 0000" # Placeholder
+def run_ocr(image, camera_name=None, track_id=None, callback=None):
+    """
+    Reads a license plate through the OCR stage (ocr.py). With a callback it returns at once and
+    the plate is delivered later; without one it blocks for the result, as it always has.
+    """
+    stage = get_ocr_stage()
+    if callback is not None:
+        stage.submit(camera_name, track_id, image, lambda text, confidence: callback(text))
+        return None
+
+    done = threading.Event()
+    result = [UNKNOWN_PLATE]
+    def on_read(text, confidence):
+        result[0] = text
+        done.set()
+    stage.submit(camera_name, track_id, image, on_read)
+    done.wait(OCR_TIMEOUT)
+    return result[0]
 
 def send_violation_to_server(payload):
-    """Sends a detected violation to the Node.js server."""
-    try:
-        response = requests.post(VIOLATION_API_ENDPOINT, json=payload)
-        if response.status_code == 201:
-            print(f"✅ Violation sent successfully for {payload['licensePlate']}")
-        else:
-            print(f"❌ Failed to send violation. Status: {response.status_code}, {response.text}")
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error sending violation: {e}")
\ No newline at end of file
+    """
+    Queues a detected violation for the Node.js server. It is stored in the on-disk outbox
+    right away and delivered in batches by its shipper thread (see outbox.py).
+    """
+    key = get_outbox().append(payload)
+    print(f"📥 Violation queued for {payload['licensePlate']} ({key})")
@@ -28,6 +28,12 @@ const violationSchema = new mongoose.Schema({
     type: String,
     required: true,
   },
+  // Set by the Python outbox so a redelivered violation is stored only once
+  idempotencyKey: {
+    type: String,
+    unique: true,
+    sparse: true,
+  },
   // When the violation occurred
   timestamp: {
     type: Date,
@@ -6,19 +6,26 @@ import { cityState } from '../services/cityState.js';
 
 import Intersection from '../models/Intersection.js';
 import Camera from '../models/Camera.js';
+import { configETag } from '../services/configETag.js';
 
 
 const router = express.Router();
 
 // --- The config endpoint for Python (This part was correct) ---
 // GET /api/intersections/:id
+// The Python manager polls this with If-None-Match; an unchanged config is a 304 with no body
 router.get('/:id', async (req, res) => {
   try {
     const intersection = await Intersection.findById(req.params.id).populate('cameras');
     if (!intersection) {
       return res.status(404).json({ msg: 'Intersection not found in database' });
     }
-    res.json(intersection); 
+    const config = intersection.toJSON();
+    res.set('ETag', configETag(config));
+    if (req.fresh) {
+      return res.status(304).end();
+    }
+    res.json(config);
   } catch (err) {
     console.error("Error fetching intersection config:", err.message);
     res.status(500).send('Server Error');
@@ -44,9 +51,36 @@ router.get('/', (req, res) => {
 
 // --- The data-in endpoint for Python (This part was correct) ---
 // POST /api/intersections/:id/data
-router.post('/:id/data', (req, res) => {
+// Accepts either JSON (annotatedFrame as base64) or the binary layout from python-service/transport.py:
+// [4-byte big-endian metadata length][metadata JSON][raw JPEG bytes]
+const rawFrameParser = express.raw({ type: 'application/octet-stream', limit: '50mb' });
+
+function unpackFramePayload(buffer) {
+  if (buffer.length < 4) return null;
+  const metadataLength = buffer.readUInt32BE(0);
+  if (4 + metadataLength > buffer.length) return null;
+  const metadata = JSON.parse(buffer.toString('utf8', 4, 4 + metadataLength));
+  const jpeg = buffer.subarray(4 + metadataLength);
+  // The dashboard renders frames as base64 data URLs, so convert once here
+  metadata.annotatedFrame = jpeg.length > 0 ? jpeg.toString('base64') : undefined;
+  return metadata;
+}
+
+router.post('/:id/data', rawFrameParser, (req, res) => {
   const { id } = req.params;
-  const { cameraName, densities, annotatedFrame, pollutionScore, pedestrianWaiting } = req.body;
+
+  let data = req.body;
+  if (Buffer.isBuffer(req.body)) {
+    try {
+      data = unpackFramePayload(req.body);
+    } catch (err) {
+      data = null;
+    }
+    if (!data) {
+      return res.status(400).json({ message: 'Malformed binary frame payload' });
+    }
+  }
+  const { cameraName, densities, annotatedFrame, pollutionScore, pedestrianWaiting } = data;
 
   // Find the 'real' ID from the cityState object
   const realId = Object.keys(cityState).find(id => !cityState[id].isSimulated);
@@ -56,12 +90,17 @@ router.post('/:id/data', (req, res) => {
     if (cameraName && nodeState.densities.hasOwnProperty(cameraName)) {
       const densityValues = densities ? Object.values(densities) : [];
       nodeState.densities[cameraName] = densityValues.length > 0 ? densityValues[0] : 0;
-      nodeState.frames[cameraName] = annotatedFrame;
+      // Intermediate (densities-only) updates carry no frame; keep showing the last annotated one
+      if (annotatedFrame) {
+        nodeState.frames[cameraName] = annotatedFrame;
+      }
 
       if (pollutionScore !== undefined) {
         nodeState.pollutionScores[cameraName] = pollutionScore;
       }
-      nodeState.pedestrianWaiting[cameraName] = pedestrianWaiting || false;
+      if (pedestrianWaiting !== undefined) {
+        nodeState.pedestrianWaiting[cameraName] = pedestrianWaiting || false;
+      }
     }
   } else {
     return res.status(404).json({ message: "Intersection not found or is simulated" });
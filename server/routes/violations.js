@@ -18,30 +18,41 @@ router.get('/', async (req, res) => {
   }
 });
 
+const REQUIRED_FIELDS = ['intersectionId', 'intersectionName', 'cameraName', 'licensePlate', 'imageUrl'];
+const MAX_BULK_SIZE = 500;
+
+// Picks the stored fields out of a request body; null if a required one is missing
+function toViolationFields(body) {
+  if (!body || REQUIRED_FIELDS.some(field => !body[field])) {
+    return null;
+  }
+  const fields = {};
+  REQUIRED_FIELDS.forEach(field => { fields[field] = body[field]; });
+  if (body.idempotencyKey) fields.idempotencyKey = String(body.idempotencyKey);
+  if (body.timestamp) fields.timestamp = new Date(body.timestamp);
+  return fields;
+}
+
 // --- POST /api/violations ---
 // This is for our dummy Python script to create new fake violations
 router.post('/', async (req, res) => {
   try {
-    const { 
-      intersectionId, 
-      intersectionName, 
-      cameraName, 
-      licensePlate, 
-      imageUrl 
-    } = req.body;
+    const fields = toViolationFields(req.body);
 
     // Simple validation
-    if (!intersectionId || !intersectionName || !cameraName || !licensePlate || !imageUrl) {
+    if (!fields) {
       return res.status(400).json({ msg: 'Missing required fields' });
     }
 
-    const newViolation = new Violation({
-      intersectionId,
-      intersectionName,
-      cameraName,
-      licensePlate,
-      imageUrl
-    });
+    if (fields.idempotencyKey) {
+      // Already stored? Answer with the original instead of a duplicate
+      const existing = await Violation.findOne({ idempotencyKey: fields.idempotencyKey });
+      if (existing) {
+        return res.status(200).json(existing);
+      }
+    }
+
+    const newViolation = new Violation(fields);
 
     await newViolation.save();
     res.status(201).json(newViolation); // 201 = Created
@@ -51,4 +62,48 @@ router.post('/', async (req, res) => {
   }
 });
 
+// --- POST /api/violations/bulk ---
+// The Python violation outbox delivers batches here: { violations: [{ ..., idempotencyKey }] }
+// Upserts by idempotency key, so a batch can be redelivered safely. Responds with the keys
+// that are stored ('accepted', including earlier deliveries) and the ones that never will be ('rejected').
+router.post('/bulk', async (req, res) => {
+  const violations = req.body && req.body.violations;
+  if (!Array.isArray(violations)) {
+    return res.status(400).json({ msg: 'Expected { violations: [...] }' });
+  }
+  if (violations.length > MAX_BULK_SIZE) {
+    return res.status(413).json({ msg: `At most ${MAX_BULK_SIZE} violations per request` });
+  }
+
+  const accepted = [];
+  const rejected = [];
+  const operations = [];
+  violations.forEach(body => {
+    const fields = toViolationFields(body);
+    if (!fields || !fields.idempotencyKey) {
+      rejected.push({ idempotencyKey: body && body.idempotencyKey, msg: 'Missing required fields' });
+      return;
+    }
+    accepted.push(fields.idempotencyKey);
+    operations.push({
+      updateOne: {
+        filter: { idempotencyKey: fields.idempotencyKey },
+        update: { $setOnInsert: fields },
+        upsert: true,
+      },
+    });
+  });
+
+  try {
+    if (operations.length) {
+      await Violation.bulkWrite(operations, { ordered: false });
+    }
+    res.json({ accepted, rejected });
+  } catch (err) {
+    // Nothing is acknowledged, so the outbox retries the whole batch (upserts make that safe)
+    console.error(err.message);
+    res.status(500).send('Server Error');
+  }
+});
+
 export default router;
\ No newline at end of file
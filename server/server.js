@@ -39,6 +39,8 @@ app.use(cors());
 app.use(express.json({ limit: '50mb' }));
 app.use(express.urlencoded({ limit: '50mb', extended: true }));
 app.use('/violation-cars', express.static(path.join(__dirname, '../python-service/violation-cars')));
+// Content-addressed violation evidence written by python-service/evidence.py (immutable by design)
+app.use('/evidence', express.static(path.join(__dirname, '../python-service/evidence'), { immutable: true, maxAge: '365d' }));
 
 // --- 3. Socket.IO connection listener (UPDATED) ---
 io.on('connection', (socket) => {
@@ -60,6 +62,14 @@ io.on('connection', (socket) => {
     // The GTM loop will send updates automatically
   });
 
+  // Actuation latency histograms from python-service/bridge.py
+  socket.on('bridge-latency', (report) => {
+    const endToEnd = report?.hops?.end_to_end;
+    if (endToEnd) {
+      console.log(`⏱️ Bridge ${report.intersectionId}: decision -> serial write p50=${endToEnd.p50_ms}ms p99=${endToEnd.p99_ms}ms (n=${endToEnd.count})`);
+    }
+  });
+
   socket.on('disconnect', () => {
     console.log(`👋 Client disconnected: ${socket.id}`);
   });
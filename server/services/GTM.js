@@ -103,6 +103,7 @@ import { simulateCityFlow } from './simulation.js';
 import ScheduledRoute from '../models/ScheduledRoute.js'; 
 
 const GTM_INTERVAL_MS = 2000;
+let arduinoCommandSeq = 0; // Lets the bridge match latency reports to commands
 
 /**
  * This is the main GTM loop function.
@@ -172,6 +173,7 @@ export async function runGlobalTrafficManager(io) {
             cityLayout,
             vipPriorityLane 
         );
+        const decidedAt = Date.now(); // For the bridge's actuation latency tracing
 
         // Emit state update
         io.to(intersectionId).emit('state-update', nodeState);
@@ -184,7 +186,12 @@ export async function runGlobalTrafficManager(io) {
             if (lights) { 
                 const commandString = LANE_SEQUENCE.map(lane => lights[lane]?.charAt(0).toUpperCase() || 'R').join(','); // Add default 'R'
                 console.log(`[GTM] Sending Arduino command to ${intersectionId}: ${commandString}`); // <-- DEBUG LOG
-                io.to(intersectionId).emit('arduino-command', commandString);
+                io.to(intersectionId).emit('arduino-command', {
+                    command: commandString,
+                    seq: ++arduinoCommandSeq,
+                    decidedAt,
+                    emittedAt: Date.now(),
+                });
             } else {
                  console.error(`[GTM DEBUG] Error: Lights object missing for real node ${intersectionId}`);
             }
@@ -0,0 +1,11 @@
+// server/services/configETag.js
+
+import crypto from 'crypto';
+
+// An ETag for the camera/ROI configuration the Python manager polls, derived from the config
+// itself: any edit to the intersection or its cameras, by any route or directly in the
+// database, changes it, and an unchanged config keeps answering 304s across server restarts.
+export function configETag(config) {
+  const hash = crypto.createHash('sha1').update(JSON.stringify(config)).digest('base64url');
+  return `W/"${hash}"`;
+}